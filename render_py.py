@@ -3,16 +3,41 @@ import requests
 import time
 import csv
 import os
+import sys
 import json
+import logging
+import logging.handlers
+import gzip
+import io
+import zlib
+import shutil
+import itertools
+import argparse
+import atexit
+import collections
+import contextlib
+import random
+import re
+import signal
+import tempfile
+import base64
+import hashlib
+import html
 from datetime import datetime, timezone
 import http.server
 import socketserver
 import threading
+import bisect
+import heapq
+import math
+import queue
 import urllib.parse
 
 # ---------------- RENDER.COM KONFIGŪRACIJA ----------------
 PORT = int(os.environ.get('PORT', 8000))
 RENDER = os.environ.get('RENDER', False)
+# Jei nustatyta - visi RPC kvietimai įrašomi (žr. --replay)
+RPC_RECORD_FILE = os.environ.get('RPC_RECORD_FILE')
 
 # ---------------- CONFIG ----------------
 RPC_ENDPOINTS = [
@@ -30,13 +55,185 @@ DEFAULT_WALLETS = [
 ]
 
 CSV_FILE = os.path.join(os.getcwd(), "wallet_ca_events.csv")
+CSV_HEADERS = ["timestamp_local","wallet","signature","action","mint","amount","fee_sol","block_time","slot","detected_at"]
 SEEN_FILE = os.path.join(os.getcwd(), "seen_signatures.json")
+SEEN_JOURNAL_FILE = os.path.join(os.getcwd(), "seen_signatures.journal")
+STATE_FILE = os.path.join(os.getcwd(), "state_snapshot.json.gz")
+MINT_META_FILE = os.path.join(os.getcwd(), "mint_metadata.json")
+ARCHIVE_DIR = os.path.join(os.getcwd(), "event_archive")
+FILTERS_FILE = os.path.join(os.getcwd(), "ingest_filters.json")
 
 POLL_INTERVAL = 20
 SIG_LIMIT = 20
 THROTTLE = 0.12
 HAS_PLYER = False
 
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Ingest pipeline: darbininkų skaičiai ir eilių dydžiai
+FETCH_WORKERS = int(os.environ.get('FETCH_WORKERS', 2))
+EXTRACT_WORKERS = int(os.environ.get('EXTRACT_WORKERS', 1))
+INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', 200))
+SINK_BATCH = 50
+
+# Seen žurnalo suspaudimas: po tiek įrašų arba po tiek sekundžių
+SEEN_COMPACT_ENTRIES = 10000
+SEEN_COMPACT_INTERVAL = 300
+SEEN_COMPACT_CHECK = 10
+STATE_SNAPSHOT_INTERVAL = 60
+STATE_RECENT_EVENTS = 200
+
+# Mint metaduomenų kešas
+MINT_META_TTL = 24 * 3600
+MINT_META_NEGATIVE_TTL = 600
+MINT_META_BATCH = 100  # getMultipleAccounts limitas
+MINT_META_COLLECT = 0.5  # kiek palaukti, kad į vieną batch'ą patektų daugiau mint'ų
+
+# Senesni įvykiai perkeliami iš CSV į dienų archyvą (reikia numpy)
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 7))
+ARCHIVE_INTERVAL = 3600
+
+# Didinama kiekvieną kartą pakeitus wallet'ų sąrašą (naudojama dashboard ETag)
+WALLETS_VERSION = 0
+
+# Logging: LOG_FORMAT=json struktūruotam išvedimui, LOG_EVENTS=0 išjungia per-įvykio eilutes
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+LOG_EVENTS = os.environ.get('LOG_EVENTS', '1') != '0'
+LOG_QUEUE_SIZE = 10000
+LOG_RATE_LIMIT = 5  # tas pats pranešimas ne daugiau kartų per intervalą
+LOG_RATE_INTERVAL = 60
+
+# ---------------- LOGGING ----------------
+LOG = logging.getLogger("tracker")
+EVENT_LOG = logging.getLogger("tracker.events")
+HTTP_LOG = logging.getLogger("tracker.http")
+
+
+class TextFormatter(logging.Formatter):
+    """Kaip print() - tik pranešimas, plius praleistų pasikartojimų skaičius"""
+
+    def format(self, record):
+        message = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{message} (+{suppressed} similar suppressed)" if suppressed else message
+
+
+class JsonFormatter(logging.Formatter):
+    """Vienas JSON objektas eilutėje; extra={"fields": {...}} tampa laukais"""
+
+    def format(self, record):
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            data.update(fields)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            data["suppressed"] = suppressed
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Tas pats pranešimo šablonas - ne daugiau nei limit kartų per intervalą.
+
+    Raktas yra (logger, šablonas), todėl kvietimai turi naudoti %-argumentus,
+    o ne f-string'us. Per-įvykio logger'is neribojamas - jį valdo LOG_EVENTS,
+    HTTP prieigos eilutės taip pat neribojamos.
+    """
+
+    def __init__(self, limit=LOG_RATE_LIMIT, interval=LOG_RATE_INTERVAL):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.suppressed = 0
+        self._lock = threading.Lock()
+        self._windows = {}
+
+    def filter(self, record):
+        if record.name in (EVENT_LOG.name, HTTP_LOG.name):
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if len(self._windows) > 1000:
+                    self._windows = {k: w for k, w in self._windows.items() if now - w[0] < self.interval}
+                self._windows[key] = [now, 1, 0]
+                if window is not None and window[2]:
+                    record.suppressed = window[2]
+                return True
+            if window[1] < self.limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed += 1
+            return False
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Niekada neblokuoja kviečiančios gijos: pilnoje eilėje įrašas išmetamas"""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_LOG_HANDLER = None
+_LOG_LISTENER = None
+_LOG_RATE_FILTER = None
+
+
+def setup_logging(level=None, fmt=None, events=None):
+    """Įrašai per ribotą eilę, į stdout juos rašo QueueListener fono gija"""
+    global _LOG_HANDLER, _LOG_LISTENER, _LOG_RATE_FILTER
+    if _LOG_LISTENER is not None:
+        return
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if (fmt or LOG_FORMAT) == "json" else TextFormatter())
+    _LOG_RATE_FILTER = RateLimitFilter()
+    _LOG_HANDLER = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _LOG_HANDLER.addFilter(_LOG_RATE_FILTER)
+    LOG.addHandler(_LOG_HANDLER)
+    LOG.setLevel(level or LOG_LEVEL)
+    LOG.propagate = False
+    EVENT_LOG.setLevel(logging.INFO if (LOG_EVENTS if events is None else events) else logging.WARNING)
+    _LOG_LISTENER = logging.handlers.QueueListener(_LOG_HANDLER.queue, stream)
+    _LOG_LISTENER.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Išrašyti eilėje likusius įrašus ir sustabdyti fono giją"""
+    global _LOG_LISTENER
+    if _LOG_LISTENER is not None:
+        _LOG_LISTENER.stop()
+        _LOG_LISTENER = None
+
+
+def log_stats():
+    if _LOG_HANDLER is None:
+        return None
+    return {
+        "queue_depth": _LOG_HANDLER.queue.qsize(),
+        "dropped": _LOG_HANDLER.dropped,
+        "suppressed": _LOG_RATE_FILTER.suppressed,
+        "events": EVENT_LOG.isEnabledFor(logging.INFO),
+    }
+
 # ---------------- WALLET MANAGEMENT ----------------
 def load_wallets():
     """Įkelti wallet'us iš failo arba naudoti default'us"""
@@ -44,22 +241,34 @@ def load_wallets():
         if os.path.exists(WALLETS_FILE):
             with open(WALLETS_FILE, 'r') as f:
                 wallets = json.load(f)
-                print(f"✅ Loaded {len(wallets)} wallets from file")
+                LOG.info("✅ Loaded %d wallets from file", len(wallets))
                 return wallets
     except Exception as e:
-        print(f"❌ Error loading wallets: {e}")
+        LOG.error("❌ Error loading wallets: %s", e)
     
-    print("✅ Using default wallets")
+    LOG.info("✅ Using default wallets")
     return DEFAULT_WALLETS.copy()
 
+def atomic_write_json(path, data, indent=None):
+    """Įrašyti JSON per laikiną failą ir os.replace - failas arba senas, arba naujas"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
 def save_wallets(wallets):
     """Išsaugoti wallet'us į failą"""
+    global WALLETS_VERSION
+    WALLETS_VERSION += 1
     try:
-        with open(WALLETS_FILE, 'w') as f:
-            json.dump(wallets, f, indent=2)
-        print(f"✅ Saved {len(wallets)} wallets to file")
+        atomic_write_json(WALLETS_FILE, wallets, indent=2)
+        LOG.info("✅ Saved %d wallets to file", len(wallets))
+        return True
     except Exception as e:
-        print(f"❌ Error saving wallets: {e}")
+        LOG.error("❌ Error saving wallets: %s", e)
+        return False
 
 def validate_wallet_address(wallet):
     """Validuoti wallet adresą"""
@@ -77,13 +286,56 @@ def get_valid_wallets():
     valid_wallets = []
     for wallet in wallets:
         if validate_wallet_address(wallet):
-            valid_wallets.append(wallet)
+            valid_wallets.append(sys.intern(wallet))
         else:
-            print(f"❌ Removing invalid wallet: {wallet}")
+            LOG.warning("❌ Removing invalid wallet: %s", wallet)
     return valid_wallets
 
-# INICIJUOTI VALID_WALLETS kaip global kintamąjį
-VALID_WALLETS = get_valid_wallets()
+def apply_wallet_changes(add=(), remove=()):
+    """Pridėti/pašalinti daug wallet'ų vienu atominiu įrašymu.
+
+    VALID_WALLETS sąrašas niekada nekeičiamas vietoje - pakeičiamas nauju,
+    todėl poller'is kitame cikle pamato visą pakeitimą iš karto.
+    """
+    global VALID_WALLETS
+    result = {"added": 0, "removed": 0, "already_present": 0, "not_found": 0, "invalid": []}
+    with WALLETS_LOCK:
+        current = set(VALID_WALLETS)
+        to_add = []
+        for wallet in dict.fromkeys(w.strip() for w in add if isinstance(w, str)):
+            if not wallet:
+                continue
+            if not validate_wallet_address(wallet):
+                result["invalid"].append(wallet)
+            elif wallet in current:
+                result["already_present"] += 1
+            else:
+                to_add.append(sys.intern(wallet))
+                current.add(wallet)
+
+        to_remove = set()
+        for wallet in set(w.strip() for w in remove if isinstance(w, str)):
+            if wallet in current:
+                to_remove.add(wallet)
+            elif wallet:
+                result["not_found"] += 1
+
+        if to_add or to_remove:
+            new_wallets = [w for w in VALID_WALLETS if w not in to_remove]
+            new_wallets.extend(w for w in to_add if w not in to_remove)
+            if not save_wallets(new_wallets):
+                raise IOError("could not persist wallet list")
+            VALID_WALLETS = new_wallets
+            for wallet in to_add:
+                ADDRESS_INDEX.add(wallet, "wallet")
+            result["added"] = len(to_add)
+            result["removed"] = len(to_remove)
+        result["wallet_count"] = len(VALID_WALLETS)
+    return result
+
+# VALID_WALLETS užpildomas main() metu - importuojant jokio disko I/O
+WALLETS_LOCK = threading.Lock()
+VALID_WALLETS = []
 
 # ---------------- LIKĘS KODAS BE PAKEITIMŲ ----------------
 session = requests.Session()
@@ -101,6 +353,8 @@ def validate_config():
 
 def safe_rpc_call(method, params, timeout=10, max_retries=3):
     """Saugus RPC call su retry mechanizmu"""
+    if RPC_REPLAY is not None:
+        max_retries = 1
     for attempt in range(max_retries):
         result = rpc_call(method, params, timeout)
         if result is not None:
@@ -111,6 +365,16 @@ def safe_rpc_call(method, params, timeout=10, max_retries=3):
 
 def rpc_call(method, params, timeout=10):
     """RPC call su failover per visus endpoint'us"""
+    if RPC_REPLAY is not None:
+        return RPC_REPLAY.call(method, params)
+    if RPC_RECORDER is not None:
+        start = time.perf_counter()
+        result = _rpc_call(method, params, timeout)
+        RPC_RECORDER.record(method, params, result, time.perf_counter() - start)
+        return result
+    return _rpc_call(method, params, timeout)
+
+def _rpc_call(method, params, timeout):
     payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
     last_err = None
     for rpc in RPC_ENDPOINTS:
@@ -126,46 +390,717 @@ def rpc_call(method, params, timeout=10):
         except Exception as e:
             last_err = str(e)
             continue
-    print(f"RPC failed for {method}: {last_err}")
+    LOG.warning("RPC failed for %s: %s", method, last_err)
     return None
 
+# ---------------- ETAPŲ STATISTIKA ----------------
+class StageStats:
+    """Pipeline etapų trukmės (count, vidurkis, percentiliai)"""
+
+    def __init__(self, max_samples=20000):
+        self._lock = threading.Lock()
+        self._max_samples = max_samples
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+            self._counts = {}
+            self._totals = {}
+
+    def record(self, stage, seconds):
+        with self._lock:
+            count = self._counts.get(stage, 0) + 1
+            self._counts[stage] = count
+            self._totals[stage] = self._totals.get(stage, 0.0) + seconds
+            samples = self._samples.setdefault(stage, [])
+            if len(samples) < self._max_samples:
+                samples.append(seconds)
+            else:
+                # Reservoir sampling - atmintis ribota, imtis tolygi
+                j = random.randrange(count)
+                if j < self._max_samples:
+                    samples[j] = seconds
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def summary(self):
+        with self._lock:
+            result = {}
+            for stage, samples in self._samples.items():
+                ordered = sorted(samples)
+                def pct(q):
+                    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+                result[stage] = {
+                    "count": self._counts[stage],
+                    "mean_ms": round(self._totals[stage] / self._counts[stage] * 1000, 3),
+                    "p50_ms": pct(0.50),
+                    "p95_ms": pct(0.95),
+                    "p99_ms": pct(0.99),
+                    "max_ms": round(ordered[-1] * 1000, 3),
+                }
+            return result
+
+
+STAGE_STATS = StageStats()
+
+
+class LatencySketch:
+    """Srautinis kvantilių eskizas (DDSketch principu).
+
+    Reikšmės dedamos į logaritminius krepšelius, todėl kvantilio santykinė
+    paklaida ne didesnė nei alpha, o atmintis priklauso tik nuo reikšmių
+    diapazono, ne nuo jų skaičiaus.
+    """
+
+    def __init__(self, alpha=0.01, min_value=0.001):
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.bins = {}
+        self.zero = 0
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, value):
+        self.count += 1
+        if value > self.max:
+            self.max = value
+        if value <= self.min_value:
+            # Neigiamas vėlavimas - laikrodžių/blockTime apvalinimo paklaida
+            self.zero += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+
+    def quantile(self, q):
+        return self.quantiles((q,))[0]
+
+    def quantiles(self, qs):
+        """Keli kvantiliai vienu krepšelių perėjimu (qs didėjančia tvarka)"""
+        if not self.count:
+            return [None] * len(qs)
+        result = []
+        seen = self.zero
+        keys = iter(sorted(self.bins))
+        key = None
+        for q in qs:
+            rank = q * (self.count - 1)
+            if rank < self.zero:
+                result.append(0.0)
+                continue
+            while seen <= rank:
+                key = next(keys, None)
+                if key is None:
+                    break
+                seen += self.bins[key]
+            if key is None:
+                result.append(self.max)
+            else:
+                result.append(2 * self.gamma ** key / (self.gamma + 1))
+        return result
+
+
+class DetectionLag:
+    """Vėlavimas nuo blockTime iki aptikimo, įrašymo ir pranešimo.
+
+    Kiekvienam etapui laikomas LatencySketch bendrai ir kiekvienam wallet'ui.
+    """
+
+    CHECKPOINTS = ("detected", "persisted", "notified")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._overall = {cp: LatencySketch() for cp in self.CHECKPOINTS}
+            self._by_wallet = {}
+            self.version = 0
+
+    def record(self, wallet, block_time, **stamps):
+        if not block_time:
+            return
+        with self._lock:
+            sketches = self._by_wallet.get(wallet)
+            if sketches is None:
+                sketches = self._by_wallet[wallet] = {cp: LatencySketch() for cp in self.CHECKPOINTS}
+            for cp, ts in stamps.items():
+                if ts is None:
+                    continue
+                lag = ts - block_time
+                self._overall[cp].add(lag)
+                sketches[cp].add(lag)
+            self.version += 1
+
+    QUANTILES = (0.50, 0.95, 0.99)
+
+    @classmethod
+    def _summarize(cls, sketches):
+        result = {"count": sketches["detected"].count}
+        for cp, sketch in sketches.items():
+            values = sketch.quantiles(cls.QUANTILES)
+            result[cp] = {f"p{int(q * 100)}_s": None if v is None else round(v, 3)
+                          for q, v in zip(cls.QUANTILES, values)}
+        return result
+
+    def summary(self, top=None):
+        """Bendra suvestinė ir wallet'ai; top - tik tiek daugiausiai įvykių turinčių"""
+        with self._lock:
+            wallets = self._by_wallet.items()
+            if top is not None:
+                wallets = heapq.nlargest(top, wallets, key=lambda item: item[1]["detected"].count)
+            return {
+                "overall": self._summarize(self._overall),
+                "wallets": {w: self._summarize(s) for w, s in wallets},
+            }
+
+
+LAG_STATS = DetectionLag()
+
+# ---------------- RPC ĮRAŠYMAS / PAKARTOJIMAS ----------------
+class RPCRecorder:
+    """Visų RPC užklausų ir atsakymų įrašymas į gzip NDJSON failą"""
+
+    def __init__(self, path, flush_every=50):
+        self.path = path
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._flush_every = flush_every
+        self._unflushed = 0
+        self.records = 0
+
+    def record(self, method, params, result, elapsed):
+        line = json.dumps({"t": time.time(), "method": method, "params": params,
+                           "result": result, "ms": round(elapsed * 1000, 3)},
+                          separators=(",", ":"))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + "\n")
+            self.records += 1
+            self._unflushed += 1
+            if self._unflushed >= self._flush_every:
+                self._file.flush()
+                self._unflushed = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class RPCReplay:
+    """Atsakymai iš įrašyto failo vietoj tinklo.
+
+    Užklausos sutapatinamos pagal (method, pirmas parametras) - pvz.
+    signature'ą ar wallet'ą - nes kiti parametrai (pvz. 'until') priklauso
+    nuo pakartojimo būsenos. Kartotiniai atsakymai grąžinami FIFO tvarka.
+    """
+
+    def __init__(self, path):
+        self.records = []
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.records.append(json.loads(line))
+                    except ValueError:
+                        break  # nutrauktas įrašas failo gale
+        except (EOFError, gzip.BadGzipFile):
+            # Procesas nužudytas neuždarius failo - naudojami iki flush'o įrašyti įrašai
+            LOG.warning("⚠️ Capture %s is truncated, using %d complete records", path, len(self.records))
+        self._responses = {}
+        for rec in self.records:
+            self._responses.setdefault(self.key(rec["method"], rec["params"]), collections.deque()).append(rec["result"])
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(method, params):
+        first = params[0] if params else None
+        if isinstance(first, list):
+            # getMultipleAccounts raktų tvarka priklauso nuo set'o iteracijos
+            first = sorted(first)
+        return method, json.dumps(first, sort_keys=True)
+
+    def call(self, method, params):
+        with self._lock:
+            queue = self._responses.get(self.key(method, params))
+            if not queue:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # Paskutinis atsakymas paliekamas pakartotiniams kvietimams
+            return queue.popleft() if len(queue) > 1 else queue[0]
+
+
+RPC_RECORDER = None
+RPC_REPLAY = None
+
+
+def run_replay(path, speed=1.0):
+    """Pakartoti įrašytą srautą per visą pipeline ir išspausdinti ataskaitą"""
+    setup_logging()
+    global RPC_REPLAY, CSV_FILE, THROTTLE
+    RPC_REPLAY = RPCReplay(path)
+    polls = [rec for rec in RPC_REPLAY.records if rec["method"] == "getSignaturesForAddress" and rec["params"]]
+    if not polls:
+        LOG.error("❌ Capture has no getSignaturesForAddress calls")
+        return None
+
+    # Pakartojimas neliečia tikrų duomenų failų
+    workdir = tempfile.mkdtemp(prefix="replay-")
+    CSV_FILE = os.path.join(workdir, "wallet_ca_events.csv")
+    MINT_METADATA.path = os.path.join(workdir, "mint_metadata.json")
+    THROTTLE = THROTTLE / speed
+    init_csv()
+    seen = SeenJournal(os.path.join(workdir, "seen.json"), os.path.join(workdir, "seen.journal")).load()
+    INGEST_FILTER.maybe_reload()
+    pipeline = IngestPipeline(seen).start()
+    STAGE_STATS.reset()
+
+    LOG.info("▶️ Replaying %d polls from %s at %sx (%d RPC records)", len(polls), path, speed, len(RPC_REPLAY.records))
+    t0 = polls[0]["t"]
+    start = time.time()
+    for rec in polls:
+        delay = start + (rec["t"] - t0) / speed - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        # Tas pats konvejeris kaip produkcijoje; ciklas baigiasi ištuštėjus eilėms
+        with STAGE_STATS.timed("cycle"):
+            pipeline.poll(rec["params"][0])
+            pipeline.drain()
+        with STAGE_STATS.timed("render"):
+            render_dashboard()
+    elapsed = time.time() - start
+    seen.close()
+
+    report = {
+        "capture": path,
+        "speed": speed,
+        "polls": len(polls),
+        "events": len(EVENT_STORE),
+        "elapsed_s": round(elapsed, 3),
+        "events_per_s": round(len(EVENT_STORE) / elapsed, 2) if elapsed else None,
+        "rpc_hits": RPC_REPLAY.hits,
+        "rpc_misses": RPC_REPLAY.misses,
+        "stages": STAGE_STATS.summary(),
+        "pipeline": pipeline.stats(),
+    }
+    shutdown_logging()
+    print(f"🏁 Replay finished: {report['events']} events in {report['elapsed_s']}s "
+          f"({report['events_per_s']} events/s), RPC hits {report['rpc_hits']}, misses {report['rpc_misses']}")
+    for stage, st in report["stages"].items():
+        print(f"   {stage:10} n={st['count']:6} mean={st['mean_ms']:9.3f}ms p50={st['p50_ms']:9.3f}ms "
+              f"p95={st['p95_ms']:9.3f}ms max={st['max_ms']:9.3f}ms")
+    shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+CSV_LOCK = threading.RLock()
+
 def init_csv():
     """Inicializuoti CSV failą"""
     if not os.path.exists(CSV_FILE):
         try:
             with open(CSV_FILE, "w", newline="", encoding="utf-8") as f:
                 w = csv.writer(f)
-                w.writerow(["timestamp_local","wallet","signature","action","mint","amount","fee_sol","block_time"])
-            print(f"✅ Initialized CSV: {CSV_FILE}")
+                w.writerow(CSV_HEADERS)
+            LOG.info("✅ Initialized CSV: %s", CSV_FILE)
         except Exception as e:
-            print(f"❌ CSV init error: {e}")
+            LOG.error("❌ CSV init error: %s", e)
     else:
-        print(f"✅ CSV exists: {CSV_FILE}")
+        LOG.info("✅ CSV exists: %s", CSV_FILE)
+
+# ---------------- KOMPAKTIŠKI RAKTAI ----------------
+def address_key(value):
+    """Base58 adresas/signature -> 32/64 baitų raktas (kitaip - pats string'as)"""
+    try:
+        raw = b58decode(value)
+    except (KeyError, TypeError):
+        return value
+    return raw if len(raw) in (32, 64) else value
+
+
+def key_to_str(key):
+    """address_key() atvirkštinė funkcija"""
+    return b58encode(key) if isinstance(key, bytes) else key
+
+
+def b58_prefix_ranges(prefix, width):
+    """Base58 prefiksas -> [(lo, hi)] width baitų raktų intervalai (imtinai).
+
+    Eilutė yra '1' kiekvienam nuliniam baitui plius likusio skaičiaus
+    skaitmenys. Esant tam pačiam nulių skaičiui ir skaitmenų ilgiui eilutės
+    rikiuojasi kaip skaičiai, todėl kiekviena tokia pora duoda vieną
+    intervalą, o jo viduje baitų tvarka sutampa su eilučių tvarka.
+    """
+    rest = prefix.lstrip("1")
+    zeros = len(prefix) - len(rest)
+    if any(c not in B58_INDEX for c in rest):
+        return []
+    value = 0
+    for c in rest:
+        value = value * 58 + B58_INDEX[c]
+    ranges = []
+    # Be likusios dalies prefiksą atitinka ir daugiau nulinių baitų
+    for z in (range(zeros, width + 1) if not rest else (zeros,) if zeros < width else ()):
+        if z == width:
+            ranges.append((0, 0))
+            continue
+        # Po nulinių baitų pirmas baitas nenulinis
+        bottom, top = 256 ** (width - z - 1), 256 ** (width - z)
+        scale = 1
+        while (value or 1) * scale < top:
+            lo, hi = (value * scale, (value + 1) * scale) if rest else (scale, scale * 58)
+            lo, hi = max(lo, bottom), min(hi, top)
+            if lo < hi:
+                ranges.append((lo, hi - 1))
+            scale *= 58
+    return [(lo.to_bytes(width, "big"), hi.to_bytes(width, "big")) for lo, hi in ranges]
+
+
+class KeySet:
+    """Fiksuoto pločio raktų aibė: surikiuotas blob'as + nedidelė nauja aibė.
+
+    Milijonai signature'ų laikomi vienu bytes objektu (64 B/raktą, be
+    objekto ir set'o įrašo overhead'o); paieška - dvejetainė. Nauji raktai
+    kaupiami set'e ir periodiškai sulejami į blob'ą. Keisti tik po išoriniu
+    lock'u; skaityti galima be jo.
+    """
+
+    __slots__ = ("width", "_sorted", "_recent", "_other")
+
+    def __init__(self, width=64, blob=b""):
+        self.width = width
+        self._sorted = (blob, len(blob) // width)
+        self._recent = set()
+        self._other = set()
+
+    def __len__(self):
+        return self._sorted[1] + len(self._recent) + len(self._other)
+
+    def __contains__(self, key):
+        if key in self._recent or key in self._other:
+            return True
+        if not isinstance(key, bytes) or len(key) != self.width:
+            return False
+        blob, count = self._sorted
+        i = self._bisect(blob, count, key)
+        return i < count and blob[i * self.width:(i + 1) * self.width] == key
+
+    def _bisect(self, blob, count, key):
+        width = self.width
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if blob[mid * width:(mid + 1) * width] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def between(self, lo, hi, limit):
+        """Iki limit fiksuoto pločio raktų intervale [lo, hi] (surikiuoti)"""
+        blob, count = self._sorted
+        width = self.width
+        i = self._bisect(blob, count, lo)
+        found = []
+        while i < count and len(found) < limit:
+            key = blob[i * width:(i + 1) * width]
+            if key > hi:
+                break
+            found.append(key)
+            i += 1
+        found.extend(key for key in list(self._recent) if lo <= key <= hi)
+        found.sort()
+        return found[:limit]
+
+    def add(self, key):
+        if not isinstance(key, bytes) or len(key) != self.width:
+            self._other.add(key)
+            return
+        if key in self:
+            return
+        self._recent.add(key)
+        if len(self._recent) >= max(1024, self._sorted[1] // 16):
+            self._merge()
+
+    def update(self, keys):
+        """Daug raktų iš karto (paleidimo metu) - vienas suliejimas"""
+        for key in keys:
+            if isinstance(key, bytes) and len(key) == self.width:
+                self._recent.add(key)
+            else:
+                self._other.add(key)
+        self._merge()
+
+    def _merge(self):
+        if not self._recent:
+            return
+        blob, count = self._sorted
+        width = self.width
+        # update() nededuplikuoja su blob'u - pasikartojimai praleidžiami čia
+        merged = b"".join(key for key, _ in itertools.groupby(heapq.merge(
+            (blob[i * width:(i + 1) * width] for i in range(count)),
+            sorted(self._recent),
+        )))
+        # Pirma naujas blob'as, tik tada tuščias set'as - skaitytojas nepraleis rakto
+        self._sorted = (merged, len(merged) // width)
+        self._recent = set()
+
+    def __iter__(self):
+        blob, count = self._sorted
+        for i in range(count):
+            yield blob[i * self.width:(i + 1) * self.width]
+        yield from list(self._recent)
+        yield from list(self._other)
+
+    def blob(self):
+        """Visi fiksuoto pločio raktai vienu surikiuotu bytes objektu"""
+        self._merge()
+        return self._sorted[0]
+
+    def others(self):
+        return list(self._other)
+
+
+class SeenJournal:
+    """Matytų signature'ų ir wallet cursor'ių būsena su append-only žurnalu.
+
+    Kiekvienas naujas signature įrašomas į žurnalą (fsync kiekvienam batch'ui),
+    o fone žurnalas periodiškai suspaudžiamas į snapshot'ą (SEEN_FILE).
+    Atkūrimas: snapshot + žurnalo pakartojimas; nutrauktos eilutės ignoruojamos.
+    Atmintyje signature'ai laikomi KeySet'uose kaip 64 baitų raktai.
+    """
+
+    def __init__(self, snapshot_path, journal_path):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.rotated_path = journal_path + ".compacting"
+        self.seen = {}
+        self.cursors = {}
+        self._pending = []
+        self._journal_entries = 0
+        self._last_compact = time.time()
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._file = None
+        self._live_cursors = set()
+        self.loaded = threading.Event()
+
+    # --- įkėlimas ---
+    def fast_start(self, cursors):
+        """Tik cursor'iai (iš būsenos snapshot'o + mažo žurnalo), be pilno seen.
+
+        Wallet'ai su cursor'iumi gali būti apklausiami iš karto, nes
+        'until' grąžina tik naujesnius už jau apdorotus signature'us.
+        """
+        self.cursors.update(cursors)
+        for path in (self.rotated_path, self.journal_path):
+            self._replay(path, cursors_only=True)
+        return self
 
-def load_seen():
-    """Įkelti jau matytas transakcijas"""
-    if os.path.exists(SEEN_FILE):
+    def load(self):
+        seen_data, cursors = {}, {}
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == 3:
+                    seen_data = {
+                        wallet: KeySet(blob=base64.b64decode(blob))
+                        for wallet, blob in data["seen"].items()
+                    }
+                    for wallet, sigs in (data.get("seen_other") or {}).items():
+                        keys = seen_data.setdefault(wallet, KeySet())
+                        for sig in sigs:
+                            keys.add(sig)
+                    cursors = dict(data.get("cursors") or {})
+                elif "seen" in data and isinstance(data.get("seen"), dict):
+                    seen_data = data["seen"]
+                    cursors = dict(data.get("cursors") or {})
+                else:
+                    # Senas formatas: {wallet: [signatures]}
+                    seen_data = data
+            except Exception as e:
+                LOG.error("Seen load error: %s", e)
+        with self._lock:
+            # Sulieti su tuo, ką poller'is spėjo pažymėti kol vyko įkėlimas
+            for wallet, sigs in seen_data.items():
+                if not isinstance(sigs, KeySet):
+                    # v2/senas formatas - base58 string'ai
+                    keys = KeySet()
+                    for sig in sigs:
+                        keys.add(address_key(sig))
+                    sigs = keys
+                for key in self.seen.get(wallet, ()):
+                    sigs.add(key)
+                self.seen[sys.intern(wallet)] = sigs
+            for wallet, sig in cursors.items():
+                if wallet not in self._live_cursors:
+                    self.cursors[wallet] = sig
+            replayed = 0
+            for path in (self.rotated_path, self.journal_path):
+                replayed += self._replay(path)
+            self._journal_entries = replayed
+            self._file = open(self.journal_path, "a", encoding="utf-8")
+        if replayed:
+            LOG.info("✅ Replayed %d seen journal entries", replayed)
+        self.loaded.set()
+        return self
+
+    def _replay(self, path, cursors_only=False):
+        if not os.path.exists(path):
+            return 0
+        count = 0
+        valid_bytes = 0
+        with open(path, "rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # nebaigtas įrašas po crash'o
+                valid_bytes += len(raw)
+                parts = raw.decode("utf-8", errors="replace").rstrip("\n").split("\t")
+                if len(parts) != 3:
+                    continue
+                kind, wallet, sig = parts
+                if kind == "S" and not cursors_only:
+                    self._keys(wallet).add(address_key(sig))
+                elif kind == "C" and wallet not in self._live_cursors:
+                    self.cursors[wallet] = sig
+                count += 1
+        if valid_bytes < os.path.getsize(path) and not cursors_only:
+            # Nukirpti nebaigtą uodegą, kad nauji įrašai nesusijungtų su ja
+            os.truncate(path, valid_bytes)
+        return count
+
+    # --- naudojimas ---
+    def _keys(self, wallet):
+        keys = self.seen.get(wallet)
+        if keys is None:
+            keys = self.seen[sys.intern(wallet)] = KeySet()
+        return keys
+
+    def contains(self, wallet, sig):
+        keys = self.seen.get(wallet)
+        return keys is not None and address_key(sig) in keys
+
+    def add(self, wallet, sig):
+        with self._lock:
+            self._keys(wallet).add(address_key(sig))
+            self._pending.append(f"S\t{wallet}\t{sig}\n")
+
+    def set_cursor(self, wallet, sig):
+        with self._lock:
+            self._live_cursors.add(wallet)
+            if self.cursors.get(wallet) != sig:
+                self.cursors[wallet] = sig
+                self._pending.append(f"C\t{wallet}\t{sig}\n")
+
+    def commit(self):
+        """Įrašyti naujus įrašus į žurnalą ir fsync'inti"""
+        with self._lock:
+            if not self._pending or self._file is None:
+                return 0
+            pending, self._pending = self._pending, []
+            try:
+                self._file.write("".join(pending))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except Exception as e:
+                LOG.error("Seen journal write error: %s", e)
+                self._pending = pending + self._pending
+                return 0
+            self._journal_entries += len(pending)
+            return len(pending)
+
+    def needs_compaction(self):
+        if self._journal_entries >= SEEN_COMPACT_ENTRIES:
+            return True
+        return self._journal_entries > 0 and time.time() - self._last_compact >= SEEN_COMPACT_INTERVAL
+
+    def compact(self):
+        """Perkelti žurnalą į naują snapshot'ą"""
+        with self._compact_lock:
+            self.commit()
+            with self._lock:
+                if self._file is None:
+                    return
+                # Žurnalas pervadinamas prieš rašant snapshot'ą: crash'o atveju
+                # jis bus pakartotas ant seno snapshot'o.
+                self._file.close()
+                if os.path.exists(self.journal_path):
+                    if os.path.exists(self.rotated_path):
+                        with open(self.rotated_path, "a", encoding="utf-8") as dst, \
+                                open(self.journal_path, "r", encoding="utf-8") as src:
+                            dst.write(src.read())
+                        os.remove(self.journal_path)
+                    else:
+                        os.replace(self.journal_path, self.rotated_path)
+                self._file = open(self.journal_path, "a", encoding="utf-8")
+                seen_copy = {k: base64.b64encode(v.blob()).decode("ascii") for k, v in self.seen.items()}
+                other_copy = {k: v.others() for k, v in self.seen.items() if v.others()}
+                cursors_copy = dict(self.cursors)
+                self._journal_entries = 0
+                self._last_compact = time.time()
+            try:
+                atomic_write_json(self.snapshot_path, {"version": 3, "seen": seen_copy,
+                                                       "seen_other": other_copy, "cursors": cursors_copy})
+            except Exception as e:
+                LOG.error("Seen save error: %s", e)
+                return
+            if os.path.exists(self.rotated_path):
+                os.remove(self.rotated_path)
+
+    def cursor_snapshot(self):
+        with self._lock:
+            return dict(self.cursors)
+
+    def close(self):
+        if not self.loaded.is_set():
+            # Pilnas seen dar neįkeltas - tik prirašyti laukiančius įrašus
+            with self._lock:
+                if self._pending:
+                    with open(self.journal_path, "a", encoding="utf-8") as f:
+                        f.write("".join(self._pending))
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self._pending = []
+            return
+        self.compact()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def seen_compactor(seen):
+    """Fono gija, periodiškai suspaudžianti seen žurnalą"""
+    while True:
+        time.sleep(SEEN_COMPACT_CHECK)
         try:
-            with open(SEEN_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            # Pridėti naujus wallet'us į seen data
-            for w in VALID_WALLETS:
-                data.setdefault(w, [])
-            return {k: set(v) for k, v in data.items()}
+            if seen.needs_compaction():
+                seen.compact()
+                # Būsenos snapshot'as turi būti ne senesnis už seen snapshot'ą
+                save_state_snapshot(seen)
         except Exception as e:
-            print(f"Seen load error: {e}")
-    return {w: set() for w in VALID_WALLETS}
-
-def atomic_write_seen(seen_data):
-    """Išsaugoti matytas transakcijas"""
-    try:
-        with open(SEEN_FILE, "w", encoding="utf-8") as f:
-            json.dump({k: list(v) for k, v in seen_data.items()}, f, indent=2)
-    except Exception as e:
-        print(f"Seen save error: {e}")
+            LOG.error("Seen compaction error: %s", e)
 
 def simple_csv_row(row):
     """Paprastas CSV įrašymas su naujausiais įrašais viršuje"""
+    with CSV_LOCK:
+        _simple_csv_row(row)
+
+def _simple_csv_row(row):
     try:
         # Perskaityti esamus įrašus
         existing_rows = []
@@ -180,7 +1115,7 @@ def simple_csv_row(row):
         with open(CSV_FILE, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
             # Headers
-            writer.writerow(["timestamp_local","wallet","signature","action","mint","amount","fee_sol","block_time"])
+            writer.writerow(CSV_HEADERS)
             # Naujas įrašas
             writer.writerow([
                 row.get("timestamp_local", ""),
@@ -190,18 +1125,31 @@ def simple_csv_row(row):
                 row.get("mint", ""),
                 row.get("amount", 0),
                 row.get("fee_sol", 0),
-                row.get("block_time", "")
+                row.get("block_time", ""),
+                row.get("slot", ""),
+                row.get("detected_at", "")
             ])
             # Esami įrašai
             writer.writerows(existing_rows)
         
-        print(f"✅ CSV: {row['action']} {row['amount']} {row['mint'][:12]}...")
+        EVENT_LOG.info("✅ CSV: %s %s %s...", row['action'], row['amount'], row['mint'][:12])
     except Exception as e:
-        print(f"❌ CSV write error: {e}")
+        LOG.error("❌ CSV write error: %s", e)
+
+def rewrite_csv(events):
+    """Atomiškai perrašyti CSV iš įvykių (naujausi pirmi)"""
+    with CSV_LOCK:
+        tmp_path = f"{CSV_FILE}.tmp"
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADERS)
+            for event in events:
+                writer.writerow(["" if event.get(k) is None else event.get(k) for k in CSV_HEADERS])
+        os.replace(tmp_path, CSV_FILE)
 
 def notify_user(title, message):
     """Pranešti vartotojui su garso signalu"""
-    print(f"NOTIFY: {title} - {message}")
+    EVENT_LOG.info("NOTIFY: %s - %s", title, message)
     
     # Garso pranešimas
     try:
@@ -210,18 +1158,18 @@ def notify_user(title, message):
         if "BUY" in title.upper():
             # Trumpas optimistiškas garsas pirkimui
             winsound.PlaySound("SystemExclamation", winsound.SND_ALIAS)
-            print("🔔 BUY sound played!")
+            EVENT_LOG.debug("🔔 BUY sound played!")
         elif "SELL" in title.upper():
             # Ilgesnis garsas pardavimui
             winsound.PlaySound("SystemHand", winsound.SND_ALIAS)
-            print("🔔 SELL sound played!")
+            EVENT_LOG.debug("🔔 SELL sound played!")
         else:
             # Standartinis garsas
             winsound.PlaySound("SystemAsterisk", winsound.SND_ALIAS)
-            print("🔔 Transaction sound played!")
+            EVENT_LOG.debug("🔔 Transaction sound played!")
             
     except Exception as e:
-        print(f"🔇 Sound not available: {e}")
+        LOG.debug("🔇 Sound not available: %s", e)
 
 def validate_transaction_data(tx_json):
     """Validuoti transakcijos duomenis"""
@@ -260,7 +1208,7 @@ def extract_token_deltas(meta, wallet):
             if abs(delta) > 1e-9:
                 token_deltas[mint] = delta
     except Exception as e:
-        print(f"Token delta error: {e}")
+        LOG.warning("Token delta error: %s", e)
     return token_deltas
 
 def extract_fee_and_sol_delta(meta, tx_json, wallet):
@@ -283,624 +1231,2773 @@ def extract_fee_and_sol_delta(meta, tx_json, wallet):
     except Exception as e:
         return 0.0, 0.0
 
-def process_transaction_for_wallet(signature, wallet):
-    """Apdoroti vieną transakciją"""
-    try:
-        tx_json = safe_rpc_call("getTransaction", [signature, {"encoding": "jsonParsed", "maxSupportedTransactionVersion": 0}])
-        if not tx_json or not validate_transaction_data(tx_json):
-            return []
-        
+def fetch_transaction(signature):
+    """Fetch etapas: getTransaction vienam signature"""
+    with STAGE_STATS.timed("fetch"):
+        return safe_rpc_call("getTransaction", [signature, {"encoding": "jsonParsed", "maxSupportedTransactionVersion": 0}])
+
+def extract_rows(tx_json, signature, wallet, detected_at=None):
+    """Extract etapas: transakcija -> CSV eilutės"""
+    if not tx_json or not validate_transaction_data(tx_json):
+        return []
+    if detected_at is None:
+        detected_at = time.time()
+    # Vietinis laikas - aptikimo momentas, ne eilutės sukūrimo
+    timestamp_local = datetime.fromtimestamp(detected_at).astimezone().strftime("%Y-%m-%d %H:%M:%S")
+    
+    with STAGE_STATS.timed("extract"):
         meta = tx_json.get("meta", {})
         token_deltas = extract_token_deltas(meta, wallet)
         fee_sol, _ = extract_fee_and_sol_delta(meta, tx_json, wallet)
+    
+    rows = []
+    for mint, delta in token_deltas.items():
+        if delta > 1e-9:
+            action, amount = "BUY", float(delta)
+        elif delta < -1e-9:
+            action, amount = "SELL", float(abs(delta))
+        else:
+            action, amount = "TRANSFER", 0.0
         
-        rows = []
-        for mint, delta in token_deltas.items():
-            if delta > 1e-9:
-                action, amount = "BUY", float(delta)
-            elif delta < -1e-9:
-                action, amount = "SELL", float(abs(delta))
+        rows.append({
+            "timestamp_local": timestamp_local,
+            "wallet": wallet,
+            "signature": signature,
+            "action": action,
+            "mint": mint,
+            "amount": round(amount, 9),
+            "fee_sol": round(fee_sol, 9),
+            "block_time": tx_json.get("blockTime"),
+            "slot": tx_json.get("slot"),
+            "detected_at": round(detected_at, 3)
+        })
+    return rows
+
+def discover_signatures(wallet, seen):
+    """Discovery etapas: nauji signature'ų įrašai ir naujausias signature"""
+    options = {"limit": SIG_LIMIT}
+    cursor = seen.cursors.get(wallet)
+    if cursor:
+        # Prašyti tik naujesnių nei paskutinis apdorotas signature
+        options["until"] = cursor
+    with STAGE_STATS.timed("discover"):
+        sigs = safe_rpc_call("getSignaturesForAddress", [wallet, options])
+    if not sigs:
+        return [], None
+    
+    detected_at = time.time()
+    entries = [dict(entry, detected_at=detected_at) for entry in sigs
+               if isinstance(entry, dict) and entry.get("signature")
+               and not seen.contains(wallet, entry["signature"])]
+    newest = sigs[0].get("signature") if isinstance(sigs[0], dict) else None
+    return entries, newest
+
+def sink_rows(fetched):
+    """Sink/notify etapas: įrašymas ir pranešimai be RPC.
+
+    Nežinomi mint'ai pranešime rodomi sutrumpintu adresu ir perduodami
+    metaduomenų gijai - simbolis dashboard'e atsiras, kai bus išspręstas.
+    """
+    for wallet, sig, rows in fetched:
+        for r in rows:
+            with STAGE_STATS.timed("sink"):
+                sink_event(r)
+            persisted_at = time.time()
+            with STAGE_STATS.timed("notify"):
+                token = MINT_METADATA.label(r['mint'])
+                notify_user("Wallet CA event", f"{r['action']} {r['amount']} of {token} ({wallet[:6]}...)")
+                if EVENT_LOG.isEnabledFor(logging.INFO):
+                    EVENT_LOG.info("%s | %s... | %-6s | %8.4f | %s... | fee %.6f",
+                                   r['timestamp_local'], r['wallet'][:8], r['action'], r['amount'], r['mint'][:12], r['fee_sol'],
+                                   extra={"fields": {k: r.get(k) for k in ("wallet", "signature", "action", "mint", "amount", "slot")}})
+            LAG_STATS.record(wallet, r.get('block_time'), detected=r.get('detected_at'),
+                             persisted=persisted_at, notified=time.time())
+
+def finish_wallet(seen, wallet, newest, new_sigs):
+    """Perstumti cursor'ių, kai visi wallet'o signature'ai įrašyti"""
+    if newest:
+        seen.set_cursor(wallet, newest)
+    seen.commit()
+    if new_sigs > 0:
+        LOG.info("📥 Processed %d new transactions for %s...", new_sigs, wallet[:8])
+
+# ---------------- FILTRAI ----------------
+class IngestFilter:
+    """Taisyklės, atmetančios signature'us dar prieš getTransaction.
+
+    Naudojami tik signature sąrašo laukai (err, memo, blockTime) ir
+    wallet'o nustatymai. Mint'as ir kiekis žinomi tik po extract, todėl
+    ignore_mints ir min_amount taikomi jau išgautoms eilutėms.
+
+    ingest_filters.json pavyzdys:
+        {"skip_failed": true, "max_age_s": 3600, "memo_patterns": ["airdrop"],
+         "min_amount": 0, "wallets": {"<wallet>": {"paused": false,
+         "ignore_mints": ["<mint>"], "min_amount": 10}}}
+    """
+
+    DEFAULTS = {"skip_failed": True, "max_age_s": None, "memo_patterns": [],
+                "min_amount": 0, "wallets": {}}
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._apply(dict(self.DEFAULTS))
+        self.skipped = collections.Counter()
+        self.passed = 0
+
+    def _apply(self, rules):
+        """Sukompiliuoti viską į lokalius kintamuosius, priskirti tik pavykus"""
+        memo_re = [re.compile(p, re.IGNORECASE) for p in rules.get("memo_patterns") or ()]
+        wallets = {
+            wallet: {
+                "paused": bool(cfg.get("paused")),
+                "ignore_mints": set(cfg.get("ignore_mints") or ()),
+                "min_amount": float(cfg.get("min_amount") or 0),
+            }
+            for wallet, cfg in (rules.get("wallets") or {}).items()
+        }
+        rules = dict(rules,
+                     max_age_s=float(rules["max_age_s"]) if rules.get("max_age_s") else None,
+                     min_amount=float(rules.get("min_amount") or 0))
+        self.rules, self._memo_re, self._wallets = rules, memo_re, wallets
+
+    def maybe_reload(self):
+        """Perskaityti taisykles, jei failas pasikeitė (vienas stat per ciklą)"""
+        mtime = None
+        try:
+            mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+            if mtime == self._mtime:
+                return False
+            rules = dict(self.DEFAULTS)
+            if mtime is not None:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    rules.update(json.load(f))
+            with self._lock:
+                self._apply(rules)
+            self._mtime = mtime
+            LOG.info("✅ Ingest filters loaded (%d wallet rules)", len(self._wallets))
+            return True
+        except Exception as e:
+            LOG.error("❌ Ingest filter load error: %s", e)
+            self._mtime = mtime
+            return False
+
+    def paused(self, wallet):
+        cfg = self._wallets.get(wallet)
+        return bool(cfg and cfg["paused"])
+
+    def _reason(self, entry, now):
+        if self.rules.get("skip_failed") and entry.get("err") is not None:
+            return "failed"
+        max_age = self.rules.get("max_age_s")
+        block_time = entry.get("blockTime")
+        if max_age and block_time and now - block_time > max_age:
+            return "too_old"
+        memo = entry.get("memo")
+        if memo and any(p.search(memo) for p in self._memo_re):
+            return "memo"
+        return None
+
+    def filter_signatures(self, wallet, entries):
+        """Pre-fetch: palikti tik signature'us, kurie gali duoti BUY/SELL"""
+        now = time.time()
+        kept = []
+        with self._lock:
+            for entry in entries:
+                reason = self._reason(entry, now)
+                if reason:
+                    self.skipped[reason] += 1
+                else:
+                    kept.append(entry)
+            self.passed += len(kept)
+        return kept
+
+    def filter_rows(self, wallet, rows):
+        """Post-extract: per-wallet ignore_mints ir minimalus kiekis"""
+        if not rows:
+            return rows
+        with self._lock:
+            cfg = self._wallets.get(wallet)
+            min_amount = max(float(self.rules.get("min_amount") or 0), cfg["min_amount"] if cfg else 0)
+            kept = []
+            for row in rows:
+                if cfg and row["mint"] in cfg["ignore_mints"]:
+                    self.skipped["ignored_mint"] += 1
+                elif row["action"] in ("BUY", "SELL") and row["amount"] < min_amount:
+                    self.skipped["min_amount"] += 1
+                else:
+                    kept.append(row)
+        return kept
+
+    def stats(self):
+        with self._lock:
+            return {"passed": self.passed, "skipped": dict(self.skipped),
+                    "paused_wallets": sum(1 for cfg in self._wallets.values() if cfg["paused"])}
+
+
+INGEST_FILTER = IngestFilter(FILTERS_FILE)
+
+# ---------------- INGEST PIPELINE ----------------
+class IngestPipeline:
+    """Discovery -> fetch -> extract -> sink/notify per ribotas eiles.
+
+    Kiekvienas etapas turi savo gijas. Pilna eilė blokuoja ankstesnį
+    etapą (backpressure), todėl perkrova tik ištempia apklausos ciklą, o
+    ne augina atmintį. Wallet'o cursor'ius perstumiamas tik tada, kai
+    visi jo signature'ai praėjo sink etapą.
+    """
+
+    def __init__(self, seen, fetch_workers=FETCH_WORKERS,
+                 extract_workers=EXTRACT_WORKERS, queue_size=INGEST_QUEUE_SIZE):
+        self.seen = seen
+        self._queues = {
+            "fetch": queue.Queue(queue_size),
+            "extract": queue.Queue(queue_size),
+            "sink": queue.Queue(queue_size),
+        }
+        # Sink vienas - CSV ir pranešimų tvarka
+        self._workers = {"fetch": max(1, fetch_workers), "extract": max(1, extract_workers), "sink": 1}
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._processed = {stage: 0 for stage in ("discover", "fetch", "extract", "sink")}
+        self._blocked = {stage: 0.0 for stage in ("discover", "fetch", "extract")}
+
+    def start(self):
+        stages = (("fetch", self._fetch, "extract"), ("extract", self._extract, "sink"))
+        for stage, work, outbox in stages:
+            for _ in range(self._workers[stage]):
+                threading.Thread(target=self._run, args=(stage, work, outbox), daemon=True).start()
+        threading.Thread(target=self._sink_loop, daemon=True).start()
+        threading.Thread(target=self._metadata_loop, daemon=True).start()
+        return self
+
+    def in_flight(self, wallet):
+        with self._lock:
+            return wallet in self._in_flight
+
+    def poll(self, wallet):
+        """Discovery vienam wallet'ui; False jei wallet'as praleistas"""
+        if self.in_flight(wallet) or INGEST_FILTER.paused(wallet):
+            return False
+        entries, newest = discover_signatures(wallet, self.seen)
+        self.submit(wallet, INGEST_FILTER.filter_signatures(wallet, entries), newest)
+        return True
+
+    def submit(self, wallet, entries, newest):
+        """Discovery rezultatas; blokuoja, kol fetch eilėje atsiras vietos"""
+        if not entries:
+            finish_wallet(self.seen, wallet, newest, 0)
+            return
+        batch = {"wallet": wallet, "newest": newest, "remaining": len(entries),
+                 "count": len(entries), "failed": False}
+        with self._lock:
+            self._in_flight[wallet] = batch
+            self._processed["discover"] += len(entries)
+        for entry in entries:
+            self._put("discover", "fetch", (batch, entry, None))
+
+    def _put(self, stage, target, item):
+        try:
+            self._queues[target].put_nowait(item)
+        except queue.Full:
+            start = time.perf_counter()
+            self._queues[target].put(item)
+            with self._lock:
+                self._blocked[stage] += time.perf_counter() - start
+
+    def _fetch(self, wallet, entry, _):
+        tx_json = fetch_transaction(entry["signature"])
+        time.sleep(THROTTLE)
+        return tx_json
+
+    def _extract(self, wallet, entry, tx_json):
+        rows = extract_rows(tx_json, entry["signature"], wallet, entry["detected_at"])
+        return INGEST_FILTER.filter_rows(wallet, rows)
+
+    def _run(self, stage, work, outbox):
+        inbox = self._queues[stage]
+        while True:
+            batch, entry, payload = inbox.get()
+            try:
+                result = work(batch["wallet"], entry, payload)
+            except Exception as e:
+                LOG.error("Ingest %s error: %s", stage, e)
+                result = None
+            self._put(stage, outbox, (batch, entry, result))
+            with self._lock:
+                self._processed[stage] += 1
+            inbox.task_done()
+
+    def _sink_loop(self):
+        inbox = self._queues["sink"]
+        while True:
+            # Imti viską, kas susikaupė - mint metaduomenys vienu batch'u
+            items = [inbox.get()]
+            while len(items) < SINK_BATCH:
+                try:
+                    items.append(inbox.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                sink_rows([(batch["wallet"], entry["signature"], rows or []) for batch, entry, rows in items])
+                failed = False
+            except Exception as e:
+                LOG.error("Ingest sink error: %s", e)
+                failed = True
+            for batch, entry, _ in items:
+                if failed:
+                    # Cursor'ius nepajudės - wallet'as bus perskaitytas kitame cikle
+                    batch["failed"] = True
+                else:
+                    self.seen.add(batch["wallet"], entry["signature"])
+                batch["remaining"] -= 1
+                if batch["remaining"] == 0:
+                    self._complete(batch)
+                inbox.task_done()
+            with self._lock:
+                self._processed["sink"] += len(items)
+
+    def _metadata_loop(self):
+        """Metaduomenų etapas: lėtas getMultipleAccounts nestabdo sink/notify"""
+        while True:
+            if MINT_METADATA.wait_pending(POLL_INTERVAL):
+                time.sleep(MINT_META_COLLECT)
+                try:
+                    with STAGE_STATS.timed("metadata"):
+                        MINT_METADATA.resolve()
+                except Exception as e:
+                    LOG.error("Mint metadata resolve error: %s", e)
+
+    def _complete(self, batch):
+        try:
+            finish_wallet(self.seen, batch["wallet"],
+                          None if batch["failed"] else batch["newest"], batch["count"])
+        except Exception as e:
+            LOG.error("Wallet process error: %s", e)
+        with self._lock:
+            self._in_flight.pop(batch["wallet"], None)
+
+    def drain(self, timeout=10):
+        """Palaukti, kol visos eilės ištuštės (išjungiant)"""
+        deadline = time.time() + timeout
+        # Eilių tvarka: task_done kviečiamas tik perdavus įrašą kitam etapui
+        for q in self._queues.values():
+            with q.all_tasks_done:
+                while q.unfinished_tasks:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                    q.all_tasks_done.wait(remaining)
+        return True
+
+    def stats(self):
+        with self._lock:
+            stages = {"discover": {"processed": self._processed["discover"],
+                                   "blocked_s": round(self._blocked["discover"], 3)}}
+            for stage, q in self._queues.items():
+                stages[stage] = {
+                    "workers": self._workers[stage],
+                    "queue_depth": q.qsize(),
+                    "queue_capacity": q.maxsize,
+                    "processed": self._processed[stage],
+                    "blocked_s": round(self._blocked.get(stage, 0.0), 3),
+                }
+            return {"in_flight_wallets": len(self._in_flight),
+                    "metadata_pending": MINT_METADATA.pending_count(), "stages": stages}
+
+
+INGEST_PIPELINE = None
+
+# ---------------- TOKEN METADATA ----------------
+B58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+B58_INDEX = {c: i for i, c in enumerate(B58_ALPHABET)}
+# Dviejų skaitmenų lentelė - perpus mažiau didelio int'o dalybų koduojant
+B58_PAIRS = [a + b for a in B58_ALPHABET for b in B58_ALPHABET]
+
+def b58decode(value):
+    """Base58 string -> bytes"""
+    num = 0
+    for c in value:
+        num = num * 58 + B58_INDEX[c]
+    pad = len(value) - len(value.lstrip("1"))
+    body = num.to_bytes((num.bit_length() + 7) // 8, "big") if num else b""
+    return b"\0" * pad + body
+
+def b58encode(data):
+    """bytes -> Base58 string"""
+    num = int.from_bytes(data, "big")
+    out = []
+    while num:
+        num, rem = divmod(num, 58 * 58)
+        out.append(B58_PAIRS[rem])
+    pad = len(data) - len(data.lstrip(b"\0"))
+    return "1" * pad + "".join(reversed(out)).lstrip("1")
+
+METADATA_PROGRAM_ID = "metaqbxxUerdq28cj1RbAWkYQm3ybzjb6a8bt518x1s"
+_ED25519_P = 2 ** 255 - 19
+_ED25519_D = -121665 * pow(121666, _ED25519_P - 2, _ED25519_P) % _ED25519_P
+_ED25519_I = pow(2, (_ED25519_P - 1) // 4, _ED25519_P)
+
+def _is_on_curve(key):
+    """Ar 32 baitai yra ed25519 taškas (PDA turi būti ne ant kreivės)"""
+    p = _ED25519_P
+    y = int.from_bytes(key, "little") & ((1 << 255) - 1)
+    if y >= p:
+        return False
+    u = (y * y - 1) % p
+    v = (_ED25519_D * y * y + 1) % p
+    x2 = u * pow(v, p - 2, p) % p
+    if x2 == 0:
+        return True
+    x = pow(x2, (p + 3) // 8, p)
+    if (x * x - x2) % p:
+        x = x * _ED25519_I % p
+    return (x * x - x2) % p == 0
+
+def find_program_address(seeds, program_id):
+    """Solana PDA išvedimas (kaip Pubkey::find_program_address)"""
+    program = b58decode(program_id)
+    for bump in range(255, -1, -1):
+        digest = hashlib.sha256(b"".join(seeds) + bytes([bump]) + program + b"ProgramDerivedAddress").digest()
+        if not _is_on_curve(digest):
+            return b58encode(digest)
+    raise ValueError("no viable bump seed")
+
+def metadata_address(mint):
+    """Metaplex metadata paskyros adresas mint'ui"""
+    return find_program_address(
+        [b"metadata", b58decode(METADATA_PROGRAM_ID), b58decode(mint)], METADATA_PROGRAM_ID)
+
+def parse_metaplex_metadata(data):
+    """Išgauti name/symbol/uri iš Metaplex metadata paskyros duomenų"""
+    def read_string(offset):
+        length = int.from_bytes(data[offset:offset + 4], "little")
+        raw = data[offset + 4:offset + 4 + length]
+        return raw.decode("utf-8", errors="replace").rstrip("\x00").strip(), offset + 4 + length
+
+    if len(data) < 1 + 32 + 32 + 4 or data[0] != 4:  # Key::MetadataV1
+        return None
+    name, offset = read_string(65)
+    symbol, offset = read_string(offset)
+    uri, _ = read_string(offset)
+    return {"name": name, "symbol": symbol, "uri": uri}
+
+
+class MintMetadataCache:
+    """Mint'ų metaduomenys (decimals, supply, name, symbol) su TTL kešu.
+
+    Nežinomi mint'ai surenkami per ciklą ir išsprendžiami vienu
+    getMultipleAccounts (mint + Metaplex metadata paskyra kiekvienam).
+    Nerasti mint'ai kešuojami trumpiau (negative cache).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._pending = set()
+        self._wakeup = threading.Event()
+        self._pda = {}
+        self.version = 0
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            with self._lock:
+                self._entries.update(entries)
+            return len(entries)
+        except Exception as e:
+            LOG.error("❌ Mint metadata load error: %s", e)
+            return 0
+
+    def save(self):
+        with self._lock:
+            entries = dict(self._entries)
+        try:
+            atomic_write_json(self.path, entries)
+        except Exception as e:
+            LOG.error("❌ Mint metadata save error: %s", e)
+
+    def _fresh(self, entry, now):
+        ttl = MINT_META_TTL if entry.get("found") else MINT_META_NEGATIVE_TTL
+        return now - entry.get("fetched_at", 0) < ttl
+
+    def get(self, mint):
+        """Kešuoti metaduomenys arba None; nežinomas mint'as įtraukiamas į eilę"""
+        entry = self._entries.get(mint)
+        if entry is None or not self._fresh(entry, time.time()):
+            with self._lock:
+                self._pending.add(mint)
+            self._wakeup.set()
+        if entry and entry.get("found"):
+            return entry
+        return None
+
+    def label(self, mint, width=8):
+        """Trumpas žmogui skaitomas pavadinimas"""
+        entry = self.get(mint)
+        short = mint[:width] + '...' if len(mint) > width else mint
+        if entry and entry.get("symbol"):
+            return f"{entry['symbol']} ({short})"
+        return short
+
+    def wait_pending(self, timeout):
+        """Laukti, kol atsiras naujų nežinomų mint'ų (arba timeout)"""
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+        return bool(self._pending)
+
+    def pending_count(self):
+        return len(self._pending)
+
+    def resolve(self, mints=()):
+        """Išspręsti nurodytus ir eilėje laukiančius mint'us batch'ais"""
+        now = time.time()
+        with self._lock:
+            wanted = self._pending | set(mints)
+            self._pending = set()
+            todo = [m for m in wanted
+                    if m and (m not in self._entries or not self._fresh(self._entries[m], now))]
+        resolved = 0
+        per_call = MINT_META_BATCH // 2
+        for i in range(0, len(todo), per_call):
+            chunk = todo[i:i + per_call]
+            if self._resolve_chunk(chunk):
+                resolved += len(chunk)
             else:
-                action, amount = "TRANSFER", 0.0
-            
-            rows.append({
-                "timestamp_local": datetime.now().astimezone().strftime("%Y-%m-%d %H:%M:%S"),
-                "wallet": wallet,
-                "signature": signature,
-                "action": action,
-                "mint": mint,
-                "amount": round(amount, 9),
-                "fee_sol": round(fee_sol, 9),
-                "block_time": tx_json.get("blockTime")
-            })
-        return rows
-    except Exception as e:
-        print(f"Transaction process error: {e}")
-        return []
+                with self._lock:
+                    self._pending.update(chunk)
+        if resolved:
+            self.save()
+        return resolved
 
-def process_wallet_transactions(wallet, seen):
-    """Apdoroti visus wallet'o transakcijas"""
-    try:
-        sigs = safe_rpc_call("getSignaturesForAddress", [wallet, {"limit": SIG_LIMIT}])
-        if not sigs:
-            return seen
-        
-        new_sigs = 0
-        for entry in sigs:
-            if not isinstance(entry, dict):
-                continue
-                
-            sig = entry.get("signature")
-            if not sig or sig in seen.get(wallet, set()):
+    def _resolve_chunk(self, mints):
+        valid, pdas = [], []
+        for mint in mints:
+            try:
+                if mint not in self._pda:
+                    self._pda[mint] = metadata_address(mint)
+            except (KeyError, ValueError):
+                # Ne base58 adresas - neigiamas įrašas be RPC
+                with self._lock:
+                    self._entries[mint] = {"found": False, "fetched_at": time.time()}
                 continue
-            
-            rows = process_transaction_for_wallet(sig, wallet)
-            for r in rows:
-                simple_csv_row(r)
-                mint_short = r['mint'][:8] + '...' if len(r['mint']) > 8 else r['mint']
-                notify_user("Wallet CA event", f"{r['action']} {r['amount']} of {mint_short} ({wallet[:6]}...)")
-                print(f"{r['timestamp_local']} | {r['wallet'][:8]}... | {r['action']:6} | {r['amount']:8.4f} | {r['mint'][:12]}... | fee {r['fee_sol']:.6f}")
-            
-            seen[wallet].add(sig)
-            new_sigs += 1
-            time.sleep(THROTTLE)
-        
-        if new_sigs > 0:
-            print(f"📥 Processed {new_sigs} new transactions for {wallet[:8]}...")
-    except Exception as e:
-        print(f"Wallet process error: {e}")
-    return seen
+            valid.append(mint)
+            pdas.append(self._pda[mint])
+        if not valid:
+            return True
+        mints = valid
 
-# ---------------- WEB DASHBOARD SU WALLET PRIDĖJIMU ----------------
-class CSVHandler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            
-            html = """
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Wallet CA Tracker</title>
-                <meta charset="utf-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1">
-                <style>
-                    * {
-                        margin: 0;
-                        padding: 0;
-                        box-sizing: border-box;
-                    }
-                    body { 
-                        font-family: 'Segoe UI', Arial, sans-serif; 
-                        margin: 0; 
-                        padding: 20px; 
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        min-height: 100vh;
-                    }
-                    .container {
-                        max-width: 1400px;
-                        margin: 0 auto;
-                        background: white;
-                        border-radius: 15px;
-                        box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-                        overflow: hidden;
-                    }
-                    .header {
-                        background: linear-gradient(135deg, #2c3e50 0%, #3498db 100%);
-                        color: white;
-                        padding: 30px;
-                        text-align: center;
-                    }
-                    .header h1 {
-                        margin: 0;
-                        font-size: 2.5em;
-                        font-weight: 300;
-                    }
-                    .stats {
-                        display: grid;
-                        grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                        gap: 20px;
-                        padding: 20px;
-                        background: #f8f9fa;
-                    }
-                    .stat-card {
-                        background: white;
-                        padding: 20px;
-                        border-radius: 10px;
-                        text-align: center;
-                        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-                    }
-                    .stat-number {
-                        font-size: 2em;
-                        font-weight: bold;
-                        color: #2c3e50;
-                    }
-                    .stat-label {
-                        color: #7f8c8d;
-                        font-size: 0.9em;
-                    }
-                    .wallet-management {
-                        background: #e3f2fd;
-                        padding: 20px;
-                        margin: 20px;
-                        border-radius: 10px;
-                        border: 2px solid #2196f3;
-                        max-width: 100%;
-                        overflow: hidden;
-                    }
-                    .wallet-form {
-                        display: flex;
-                        gap: 10px;
-                        align-items: end;
-                        margin-bottom: 15px;
-                        flex-wrap: wrap;
-                    }
-                    .wallet-input {
-                        flex: 1;
-                        min-width: 300px;
-                    }
-                    .wallet-input label {
-                        display: block;
-                        margin-bottom: 5px;
-                        font-weight: bold;
-                        color: #2c3e50;
-                    }
-                    .wallet-input input {
-                        width: 100%;
-                        padding: 12px;
-                        border: 2px solid #bdc3c7;
-                        border-radius: 8px;
-                        font-size: 16px;
-                        transition: border-color 0.3s;
-                        font-family: monospace;
-                    }
-                    .wallet-input input:focus {
-                        border-color: #3498db;
-                        outline: none;
-                    }
-                    .add-btn {
-                        padding: 12px 24px;
-                        background: #27ae60;
-                        color: white;
-                        border: none;
-                        border-radius: 8px;
-                        cursor: pointer;
-                        font-size: 16px;
-                        transition: background 0.3s;
-                        white-space: nowrap;
-                    }
-                    .add-btn:hover {
-                        background: #219a52;
-                    }
-                    .current-wallets {
-                        margin-top: 20px;
-                    }
-                    .wallet-list {
-                        display: grid;
-                        grid-template-columns: repeat(auto-fill, minmax(350px, 1fr));
-                        gap: 12px;
-                        margin-top: 10px;
-                    }
-                    .wallet-item {
-                        background: white;
-                        padding: 12px 15px;
-                        border-radius: 8px;
-                        border: 1px solid #ecf0f1;
-                        display: flex;
-                        justify-content: space-between;
-                        align-items: center;
-                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                        transition: transform 0.2s;
-                    }
-                    .wallet-item:hover {
-                        transform: translateY(-2px);
-                        box-shadow: 0 4px 8px rgba(0,0,0,0.15);
-                    }
-                    .wallet-address {
-                        flex: 1;
-                        font-family: 'Courier New', monospace;
-                        font-size: 13px;
-                        word-break: break-all;
-                        color: #2c3e50;
-                        font-weight: 500;
-                    }
-                    .remove-btn {
-                        background: #e74c3c;
-                        color: white;
-                        border: none;
-                        padding: 6px 12px;
-                        border-radius: 5px;
-                        cursor: pointer;
-                        font-size: 12px;
-                        margin-left: 10px;
-                        white-space: nowrap;
-                        transition: background 0.3s;
-                    }
-                    .remove-btn:hover {
-                        background: #c0392b;
-                    }
-                    .table-container {
-                        overflow-x: auto;
-                        padding: 20px;
-                    }
-                    table {
-                        width: 100%;
-                        border-collapse: collapse;
-                        margin: 20px 0;
-                        font-size: 0.85em;
-                        min-width: 1200px;
-                    }
-                    th {
-                        background: #34495e;
-                        color: white;
-                        padding: 12px 8px;
-                        text-align: left;
-                        font-weight: 600;
-                        position: sticky;
-                        top: 0;
-                    }
-                    td {
-                        padding: 10px 8px;
-                        border-bottom: 1px solid #ecf0f1;
-                        max-width: 200px;
-                        overflow: hidden;
-                        text-overflow: ellipsis;
-                        white-space: nowrap;
-                    }
-                    tr:hover {
-                        background: #f8f9fa;
-                    }
-                    .buy { 
-                        color: #27ae60; 
-                        font-weight: bold;
-                    }
-                    .sell { 
-                        color: #e74c3c; 
-                        font-weight: bold;
-                    }
-                    .transfer {
-                        color: #95a5a6;
-                    }
-                    .refresh-info {
-                        text-align: center;
-                        padding: 10px;
-                        background: #ecf0f1;
-                        color: #7f8c8d;
-                        font-size: 0.9em;
-                    }
-                    .address-cell {
-                        cursor: pointer;
-                        position: relative;
-                        max-width: 180px;
-                    }
-                    .copy-btn {
-                        background: #3498db;
-                        color: white;
-                        border: none;
-                        padding: 3px 8px;
-                        border-radius: 3px;
-                        cursor: pointer;
-                        font-size: 0.75em;
-                        margin-left: 5px;
-                        transition: background 0.2s;
-                    }
-                    .copy-btn:hover {
-                        background: #2980b9;
-                    }
-                    .timestamp {
-                        min-width: 140px;
-                    }
-                    .action {
-                        min-width: 70px;
-                        text-align: center;
-                    }
-                    .amount {
-                        min-width: 100px;
-                        text-align: right;
-                    }
-                    .fee {
-                        min-width: 90px;
-                        text-align: right;
-                    }
-                    @media (max-width: 768px) {
-                        .container {
-                            margin: 10px;
-                            border-radius: 10px;
-                        }
-                        .header {
-                            padding: 20px;
-                        }
-                        .header h1 {
-                            font-size: 2em;
-                        }
-                        .stats {
-                            grid-template-columns: repeat(2, 1fr);
-                            padding: 15px;
-                            gap: 15px;
-                        }
-                        .table-container {
-                            padding: 10px;
-                        }
-                        .wallet-management {
-                            margin: 10px;
-                            padding: 15px;
-                        }
-                        .wallet-form {
-                            flex-direction: column;
-                        }
-                        .wallet-input {
-                            min-width: 100%;
-                        }
-                        .wallet-list {
-                            grid-template-columns: 1fr;
-                        }
-                        .wallet-item {
-                            flex-direction: column;
-                            align-items: flex-start;
-                            gap: 10px;
-                        }
-                        .remove-btn {
-                            align-self: flex-end;
-                        }
-                    }
-                    @media (max-width: 480px) {
-                        .wallet-address {
-                            font-size: 12px;
-                        }
-                        .wallet-list {
-                            grid-template-columns: 1fr;
-                        }
-                    }
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>💰 Wallet CA Tracker</h1>
-                        <p>Real-time Solana wallet transaction monitoring</p>
-                        <p style="font-size: 0.8em; opacity: 0.8;">🚀 Hosted on Render.com</p>
-                    </div>
-            """
-            
-            try:
-                # Statistics
-                total_tx = 0
-                unique_wallets = len(VALID_WALLETS)
-                unique_tokens = 0
-                
-                if os.path.exists(CSV_FILE):
-                    with open(CSV_FILE, 'r', encoding='utf-8') as f:
-                        reader = csv.DictReader(f)
-                        rows = list(reader)
-                        total_tx = len(rows)
-                        unique_tokens = len(set(row['mint'] for row in rows if row.get('mint')))
-                
-                html += f"""
-                <div class="stats">
-                    <div class="stat-card">
-                        <div class="stat-number">{total_tx}</div>
-                        <div class="stat-label">Total Transactions</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-number">{len(VALID_WALLETS)}</div>
-                        <div class="stat-label">Watched Wallets</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-number">{unique_wallets}</div>
-                        <div class="stat-label">Active Wallets</div>
-                    </div>
-                    <div class="stat-card">
-                        <div class="stat-number">{unique_tokens}</div>
-                        <div class="stat-label">Unique Tokens</div>
-                    </div>
-                </div>
-                """
-                
-                # Wallet Management Section
-                html += """
-                <div class="wallet-management">
-                    <h3>🔧 Wallet Management</h3>
-                    <form class="wallet-form" action="/add-wallet" method="post">
-                        <div class="wallet-input">
-                            <label for="wallet">Add New Wallet:</label>
-                            <input type="text" id="wallet" name="wallet" 
-                                   placeholder="Enter Solana wallet address (44 characters)" 
-                                   required maxlength="44" pattern="[A-Za-z0-9]{44}"
-                                   title="Solana wallet address must be exactly 44 characters">
-                        </div>
-                        <button type="submit" class="add-btn">➕ Add Wallet</button>
-                    </form>
-                    
-                    <div class="current-wallets">
-                        <h4>Currently Watching (<span id="wallet-count">""" + str(len(VALID_WALLETS)) + """</span> wallets):</h4>
-                        <div class="wallet-list" id="wallet-list">
-                """
-                
-                for wallet in VALID_WALLETS:
-                    html += f"""
-                            <div class="wallet-item">
-                                <span class="wallet-address">{wallet}</span>
-                                <button class="remove-btn" onclick="removeWallet('{wallet}')">🗑️ Remove</button>
-                            </div>
-                    """
-                
-                html += """
-                        </div>
-                    </div>
-                </div>
-                """
-                
-                # Transactions Table
-                if os.path.exists(CSV_FILE):
-                    with open(CSV_FILE, 'r', encoding='utf-8') as f:
-                        reader = csv.DictReader(f)
-                        rows = list(reader)
-                        # Nereikia reverse, nes dabar CSV jau turi naujausius viršuje
-                    
-                    html += """
-                    <div class="table-container">
-                        <h2 style="color: #2c3e50; margin-bottom: 20px;">Latest Transactions</h2>
-                        <table>
-                            <thead>
-                                <tr>
-                                    <th>Time</th>
-                                    <th>Wallet Address</th>
-                                    <th>Action</th>
-                                    <th>Amount</th>
-                                    <th>Token CA Address</th>
-                                    <th>Fee (SOL)</th>
-                                    <th>Signature</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                    """
-                    
-                    for row in rows[:50]:  # Rodyti tik pirmus 50 įrašų
-                        if not all(key in row for key in ['wallet', 'mint', 'signature']):
-                            continue
-                            
-                        action_class = {
-                            'BUY': 'buy',
-                            'SELL': 'sell', 
-                            'TRANSFER': 'transfer'
-                        }.get(row.get('action', ''), '')
-                        
-                        try:
-                            amount = float(row.get('amount', 0))
-                            fee = float(row.get('fee_sol', 0))
-                        except (ValueError, TypeError):
-                            amount = 0
-                            fee = 0
-                        
-                        wallet = row.get('wallet', '')
-                        mint = row.get('mint', '')
-                        signature = row.get('signature', '')
-                        timestamp = row.get('timestamp_local', '')
-                        
-                        html += f"""
-                                <tr>
-                                    <td class="timestamp">{timestamp}</td>
-                                    <td class="address-cell">
-                                        {wallet[:10]}...{wallet[-10:] if len(wallet) > 20 else ''}
-                                        <button class="copy-btn" onclick="copyToClipboard('{wallet}')">Copy</button>
-                                    </td>
-                                    <td class="action {action_class}">{row.get('action', '')}</td>
-                                    <td class="amount">{amount:,.2f}</td>
-                                    <td class="address-cell">
-                                        {mint[:10]}...{mint[-10:] if len(mint) > 20 else ''}
-                                        <button class="copy-btn" onclick="copyToClipboard('{mint}')">Copy</button>
-                                    </td>
-                                    <td class="fee">{fee:.6f}</td>
-                                    <td class="address-cell">
-                                        {signature[:10]}...{signature[-10:] if len(signature) > 20 else ''}
-                                        <button class="copy-btn" onclick="copyToClipboard('{signature}')">Copy</button>
-                                    </td>
-                                </tr>
-                        """
-                    
-                    html += """
-                            </tbody>
-                        </table>
-                    </div>
-                    """
+        result = safe_rpc_call("getMultipleAccounts", [mints + pdas, {"encoding": "jsonParsed"}])
+        if not result or not isinstance(result.get("value"), list):
+            return False
+        accounts = result["value"]
+        now = time.time()
+        with self._lock:
+            for idx, mint in enumerate(mints):
+                self._entries[mint] = self._parse_accounts(accounts[idx], accounts[idx + len(mints)], now)
+            self.version += 1
+        return True
+
+    @staticmethod
+    def _parse_accounts(mint_account, metadata_account, now):
+        entry = {"found": False, "fetched_at": now}
+        try:
+            parsed = (mint_account or {}).get("data", {}).get("parsed", {})
+            if parsed.get("type") != "mint":
+                return entry
+            info = parsed.get("info", {})
+            decimals = int(info.get("decimals", 0))
+            entry.update(found=True, decimals=decimals,
+                         supply=int(info.get("supply", 0)) / (10 ** decimals))
+            for ext in info.get("extensions") or []:
+                if ext.get("extension") == "tokenMetadata":
+                    state = ext.get("state", {})
+                    entry.update(name=state.get("name", ""), symbol=state.get("symbol", ""))
+            data = (metadata_account or {}).get("data")
+            if isinstance(data, list) and data and not entry.get("symbol"):
+                meta = parse_metaplex_metadata(base64.b64decode(data[0]))
+                if meta:
+                    entry.update(name=meta["name"], symbol=meta["symbol"])
+        except Exception as e:
+            LOG.warning("Mint metadata parse error: %s", e)
+        return entry
+
+
+MINT_METADATA = MintMetadataCache(MINT_META_FILE)
+
+# ---------------- EVENT STORE ----------------
+def normalize_event(row):
+    """Paversti CSV eilutę (string'us) į tipizuotą įvykį"""
+    def to_float(value):
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return 0.0
+
+    def to_optional(value, cast):
+        try:
+            return cast(value) if value not in (None, "") else None
+        except (ValueError, TypeError):
+            return None
+
+    return {
+        "timestamp_local": row.get("timestamp_local", ""),
+        "wallet": row.get("wallet", ""),
+        "signature": row.get("signature", ""),
+        "action": row.get("action", ""),
+        "mint": row.get("mint", ""),
+        "amount": to_float(row.get("amount", 0)),
+        "fee_sol": to_float(row.get("fee_sol", 0)),
+        "block_time": to_optional(row.get("block_time"), int),
+        "slot": to_optional(row.get("slot"), int),
+        "detected_at": to_optional(row.get("detected_at"), float),
+    }
+
+
+class EventRecord:
+    """Įvykis su __slots__ vietoj dict.
+
+    Palaiko dict sąsają (event["mint"], get, keys, items, dict(event)),
+    todėl esamas kodas veikia be pakeitimų. Wallet, mint ir action
+    internuojami - tūkstančiai įvykių dalijasi tais pačiais string'ais.
+    Signature laikomas address_key() baitais (signature_key), o base58
+    string'as atkuriamas tik jį skaitant.
+    """
+
+    __slots__ = ("timestamp_local", "wallet", "signature_key", "action", "mint",
+                 "amount", "fee_sol", "block_time", "slot", "detected_at", "seq")
+    FIELDS = ("timestamp_local", "wallet", "signature", "action", "mint",
+              "amount", "fee_sol", "block_time", "slot", "detected_at", "seq")
+    _FIELD_SET = frozenset(FIELDS)
+
+    def __init__(self, row, seq=None):
+        get = row.get
+        self.timestamp_local = get("timestamp_local", "")
+        self.wallet = sys.intern(get("wallet") or "")
+        self.signature_key = address_key(get("signature") or "")
+        self.action = sys.intern(get("action") or "")
+        self.mint = sys.intern(get("mint") or "")
+        self.amount = get("amount", 0.0)
+        self.fee_sol = get("fee_sol", 0.0)
+        self.block_time = get("block_time")
+        self.slot = get("slot")
+        self.detected_at = get("detected_at")
+        self.seq = get("seq") if seq is None else seq
+
+    @property
+    def signature(self):
+        return key_to_str(self.signature_key)
+
+    @signature.setter
+    def signature(self, value):
+        self.signature_key = address_key(value or "")
+
+    def __getitem__(self, key):
+        if key not in self._FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self._FIELD_SET:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self._FIELD_SET
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._FIELD_SET else default
+
+    def keys(self):
+        return self.FIELDS
+
+    def values(self):
+        return [getattr(self, k) for k in self.FIELDS]
+
+    def items(self):
+        return [(k, getattr(self, k)) for k in self.FIELDS]
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.FIELDS}
+
+    def __eq__(self, other):
+        if isinstance(other, (EventRecord, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"EventRecord({self.to_dict()!r})"
+
+
+def read_csv_events(path):
+    """Perskaityti CSV įvykius (grąžinami seniausi pirmi)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = [normalize_event(row) for row in csv.DictReader(f)
+                if row.get('wallet') and row.get('mint') and row.get('signature')]
+    rows.reverse()
+    return rows
+
+
+class EventStore:
+    """Įvykiai atmintyje su wallet/mint/action indeksais.
+
+    Įvykiai laikomi įrašymo tvarka (seniausi pirmi), kiekvienas gauna
+    didėjantį seq numerį, kuris naudojamas kaip API cursor'is. Indeksai
+    saugo pozicijų sąrašus, todėl filtruota užklausa liečia tik atitinkančias
+    eilutes.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._events = []
+        self._seqs = []
+        self._by_wallet = {}
+        self._by_mint = {}
+        self._by_action = {}
+        self._by_signature = {}
+        self._next_seq = 1
+        self.version = 0
+
+    def __len__(self):
+        return len(self._events)
+
+    def _index(self, event, pos):
+        self._by_wallet.setdefault(event["wallet"], []).append(pos)
+        self._by_mint.setdefault(event["mint"], []).append(pos)
+        self._by_action.setdefault(event["action"], []).append(pos)
+        self._by_signature.setdefault(event.signature_key, []).append(pos)
+
+    def add(self, row):
+        """Pridėti naują įvykį ir atnaujinti indeksus"""
+        with self._lock:
+            event = EventRecord(row, self._next_seq)
+            self._next_seq += 1
+            pos = len(self._events)
+            self._events.append(event)
+            self._seqs.append(event["seq"])
+            self._index(event, pos)
+            self.version += 1
+            return event
+
+    def load_csv(self, path):
+        """Įkelti įvykius iš CSV (failas laiko naujausius viršuje)"""
+        rows = read_csv_events(path)
+        self.replace_all(rows)
+        return len(rows)
+
+    def replace_all(self, events):
+        """Pakeisti visą turinį (seniausi pirmi) ir perstatyti indeksus"""
+        with self._lock:
+            self._events, self._seqs = [], []
+            self._by_wallet, self._by_mint, self._by_action = {}, {}, {}
+            self._by_signature = {}
+            for event in events:
+                self.add(event)
+
+    def max_seq(self):
+        return self._seqs[-1] if self._seqs else 0
+
+    def events_since_seq(self, seq):
+        """Įvykiai, pridėti po nurodyto seq"""
+        with self._lock:
+            return self._events[bisect.bisect_right(self._seqs, seq):]
+
+    def mint_count(self):
+        return len(self._by_mint)
+
+    def older_than(self, cutoff):
+        """Įvykiai su block_time < cutoff"""
+        with self._lock:
+            return [e for e in self._events if e["block_time"] is not None and e["block_time"] < cutoff]
+
+    def remove_events(self, events):
+        """Pašalinti būtent šiuos įvykius (pagal seq) ir perstatyti indeksus (seq nesikeičia)"""
+        seqs = {e["seq"] for e in events}
+        with self._lock:
+            keep = [e for e in self._events if e["seq"] not in seqs]
+            removed = len(self._events) - len(keep)
+            if not removed:
+                return 0
+            self._events = keep
+            self._seqs = [e["seq"] for e in keep]
+            self._by_wallet, self._by_mint, self._by_action = {}, {}, {}
+            self._by_signature = {}
+            for pos, event in enumerate(keep):
+                self._index(event, pos)
+            self.version += 1
+            return removed
+
+    def events_after(self, signature, mint):
+        """Įvykiai po nurodyto (signature, mint); None jei jo nebėra store'e"""
+        with self._lock:
+            if signature is None:
+                return list(self._events)
+            key = address_key(signature)
+            for pos in range(len(self._events) - 1, -1, -1):
+                event = self._events[pos]
+                if event.signature_key == key and event["mint"] == mint:
+                    return self._events[pos + 1:]
+            return None
+
+    def latest(self, limit=50):
+        """Naujausi įvykiai (naujausias pirmas)"""
+        with self._lock:
+            return self._events[:-limit - 1:-1] if limit else []
+
+    def count(self, wallet=None, mint=None, signature=None):
+        """Įvykių skaičius pagal vieną indeksą - O(1)"""
+        if wallet is not None:
+            return len(self._by_wallet.get(wallet, ()))
+        if mint is not None:
+            return len(self._by_mint.get(mint, ()))
+        if signature is not None:
+            return len(self._by_signature.get(address_key(signature), ()))
+        return len(self._events)
+
+    def query(self, wallet=None, mint=None, action=None, since=None, until=None,
+              cursor=None, limit=100, signature=None):
+        """Grąžinti (įvykiai, next_cursor) naujausius pirmus.
+
+        cursor - paskutinio gauto įvykio seq; grąžinami tik senesni įvykiai.
+        since/until - block_time intervalas (imtinai).
+        """
+        signature_key = address_key(signature) if signature is not None else None
+        with self._lock:
+            end = bisect.bisect_left(self._seqs, cursor) if cursor else len(self._events)
+
+            candidates = None
+            for index, key in ((self._by_wallet, wallet), (self._by_mint, mint),
+                               (self._by_action, action), (self._by_signature, signature_key)):
+                if key is None:
+                    continue
+                positions = index.get(key)
+                if not positions:
+                    return [], None
+                if candidates is None or len(positions) < len(candidates):
+                    candidates = positions
+
+            if candidates is None:
+                positions = range(end - 1, -1, -1)
+            else:
+                i = bisect.bisect_left(candidates, end)
+                positions = (candidates[j] for j in range(i - 1, -1, -1))
+
+            result = []
+            for pos in positions:
+                event = self._events[pos]
+                if wallet is not None and event["wallet"] != wallet:
+                    continue
+                if mint is not None and event["mint"] != mint:
+                    continue
+                if action is not None and event["action"] != action:
+                    continue
+                if signature_key is not None and event.signature_key != signature_key:
+                    continue
+                if since is not None or until is not None:
+                    bt = event["block_time"]
+                    if bt is None or (since is not None and bt < since) or (until is not None and bt > until):
+                        continue
+                if len(result) == limit:
+                    return result, str(result[-1]["seq"])
+                result.append(event)
+            return result, None
+
+    def iter_query(self, chunk_size=1000, **filters):
+        """Generatorius per visus atitinkančius įvykius (naujausi pirmi).
+
+        Lock'as laikomas tik vieno chunk'o metu, todėl ilgas eksportas
+        neblokuoja ingest'o ir atmintis nepriklauso nuo rezultato dydžio.
+        """
+        cursor = None
+        while True:
+            events, cursor = self.query(cursor=cursor, limit=chunk_size, **filters)
+            yield from events
+            if cursor is None:
+                return
+            cursor = int(cursor)
+
+
+EVENT_STORE = EventStore()
+
+
+# ---------------- FLOW AGREGATAI ----------------
+AGGREGATE_WINDOWS = (300, 3600, 86400)
+
+
+class FlowAggregates:
+    """Einamosios (wallet, mint) pozicijos ir slenkančių langų skaitikliai.
+
+    Atnaujinama kiekvienam įvykiui, todėl pozicijos paieška yra O(1), o
+    slenkančių langų sumos palaikomos minutės bucket'ais be CSV skenavimo.
+    """
+
+    def __init__(self, windows=AGGREGATE_WINDOWS):
+        self._lock = threading.RLock()
+        self.windows = tuple(sorted(windows))
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # wallet -> mint -> [bought, sold, buys, sells, fees, last_block_time]
+            self._positions = {}
+            self._mints = {}
+            self._minutes = []
+            self._buckets = {}
+            self._edges = {w: None for w in self.windows}
+            self._totals = {w: {} for w in self.windows}
+            self._now_minute = None
+            self.last_key = None
+            self.version = 0
+
+    # --- slenkantys langai ---
+    def _advance(self, minute):
+        if self._now_minute is not None and minute <= self._now_minute:
+            return
+        self._now_minute = minute
+        for window in self.windows:
+            new_edge = minute - window // 60 + 1
+            old_edge = self._edges[window]
+            self._edges[window] = new_edge
+            if old_edge is None or new_edge <= old_edge:
+                continue
+            totals = self._totals[window]
+            lo = bisect.bisect_left(self._minutes, old_edge)
+            hi = bisect.bisect_left(self._minutes, new_edge)
+            for m in self._minutes[lo:hi]:
+                for mint, count in self._buckets[m].items():
+                    left = totals.get(mint, 0) - count
+                    if left > 0:
+                        totals[mint] = left
+                    else:
+                        totals.pop(mint, None)
+        # Bucket'ai, senesni už didžiausią langą, nebereikalingi
+        cut = bisect.bisect_left(self._minutes, self._edges[self.windows[-1]])
+        if cut:
+            for m in self._minutes[:cut]:
+                del self._buckets[m]
+            del self._minutes[:cut]
+
+    def _count_in_windows(self, mint, block_time, count=1):
+        minute = int(block_time) // 60
+        self._advance(minute)
+        if minute < self._edges[self.windows[-1]]:
+            return
+        bucket = self._buckets.get(minute)
+        if bucket is None:
+            bucket = self._buckets[minute] = {}
+            bisect.insort(self._minutes, minute)
+        bucket[mint] = bucket.get(mint, 0) + count
+        for window in self.windows:
+            if minute >= self._edges[window]:
+                totals = self._totals[window]
+                totals[mint] = totals.get(mint, 0) + count
+
+    # --- atnaujinimas ---
+    def add(self, event):
+        wallet = event.get("wallet")
+        mint = event.get("mint")
+        if not wallet or not mint:
+            return
+        action = event.get("action")
+        try:
+            amount = float(event.get("amount") or 0)
+            fee = float(event.get("fee_sol") or 0)
+        except (ValueError, TypeError):
+            amount, fee = 0.0, 0.0
+        block_time = event.get("block_time")
+        with self._lock:
+            pos = self._positions.setdefault(wallet, {}).get(mint)
+            if pos is None:
+                pos = self._positions[wallet][mint] = [0.0, 0.0, 0, 0, 0.0, None]
+            if action == "BUY":
+                pos[0] += amount
+                pos[2] += 1
+            elif action == "SELL":
+                pos[1] += amount
+                pos[3] += 1
+            pos[4] += fee
+            if block_time and (pos[5] is None or block_time > pos[5]):
+                pos[5] = block_time
+            self._mints[mint] = self._mints.get(mint, 0) + 1
+            if block_time:
+                self._count_in_windows(mint, block_time)
+            self.last_key = [event.get("signature"), mint]
+            self.version += 1
+
+    # --- paieška ---
+    @staticmethod
+    def _position_dict(wallet, mint, pos):
+        bought, sold, buys, sells, fees, last_time = pos
+        return {
+            "wallet": wallet, "mint": mint,
+            "bought": round(bought, 9), "sold": round(sold, 9),
+            "net": round(bought - sold, 9),
+            "buys": buys, "sells": sells,
+            "fees_sol": round(fees, 9), "last_block_time": last_time,
+        }
+
+    def position(self, wallet, mint):
+        with self._lock:
+            pos = self._positions.get(wallet, {}).get(mint)
+            return self._position_dict(wallet, mint, pos) if pos else None
+
+    def wallet_positions(self, wallet):
+        with self._lock:
+            mints = self._positions.get(wallet, {})
+            result = [self._position_dict(wallet, m, p) for m, p in mints.items()]
+        result.sort(key=lambda p: p["last_block_time"] or 0, reverse=True)
+        return result
+
+    def mint_count(self):
+        return len(self._mints)
+
+    def active_wallet_count(self):
+        return len(self._positions)
+
+    def top_mints(self, window=3600, limit=10):
+        """Daugiausiai prekiauti mint'ai per paskutinį langą"""
+        if window not in self._totals:
+            raise ValueError(f"window must be one of {self.windows}")
+        with self._lock:
+            self._advance(int(time.time()) // 60)
+            totals = self._totals[window]
+            top = heapq.nlargest(limit, totals.items(), key=lambda kv: kv[1])
+        return [{"mint": mint, "trades": count} for mint, count in top]
+
+    def window_trades(self, window=3600):
+        with self._lock:
+            self._advance(int(time.time()) // 60)
+            return sum(self._totals[window].values())
+
+    # --- snapshot'as ---
+    def to_snapshot(self):
+        with self._lock:
+            return {
+                "version": 1,
+                "windows": list(self.windows),
+                "positions": {w: {m: list(p) for m, p in mints.items()}
+                              for w, mints in self._positions.items()},
+                "mints": dict(self._mints),
+                "buckets": {str(m): dict(self._buckets[m]) for m in self._minutes},
+                "now_minute": self._now_minute,
+                "last_key": self.last_key,
+            }
+
+    def load_snapshot(self, data):
+        if data.get("version") != 1 or list(self.windows) != data.get("windows"):
+            return False
+        with self._lock:
+            self.reset()
+            self._positions = {w: {m: list(p) for m, p in mints.items()}
+                               for w, mints in data.get("positions", {}).items()}
+            self._mints = dict(data.get("mints", {}))
+            now_minute = data.get("now_minute")
+            if now_minute is not None:
+                self._advance(now_minute)
+                for key in sorted(data.get("buckets", {}), key=int):
+                    minute = int(key)
+                    for mint, count in data["buckets"][key].items():
+                        self._count_in_windows(mint, minute * 60, count)
+            self.last_key = data.get("last_key")
+        return True
+
+    def rebuild(self, *sources):
+        """Perskaičiuoti viską iš įvykių šaltinių (archyvas, store)"""
+        with self._lock:
+            self.reset()
+            count = 0
+            for events in sources:
+                for event in events:
+                    self.add(event)
+                    count += 1
+        return count
+
+
+FLOW_AGGREGATES = FlowAggregates()
+
+
+def sink_event(row):
+    """Įrašyti įvykį į CSV, atminties store'ą ir agregatus"""
+    # CSV ir store keičiami kartu, kad archyvo perrašymas nepamestų įvykio
+    with CSV_LOCK:
+        simple_csv_row(row)
+        event = EVENT_STORE.add(row)
+    FLOW_AGGREGATES.add(event)
+    ADDRESS_INDEX.add_event(event)
+
+# ---------------- ĮVYKIŲ ARCHYVAS ----------------
+ARCHIVE_ACTIONS = ["BUY", "SELL", "TRANSFER"]
+ARCHIVE_NUMERIC_COLUMNS = {
+    "amount": "float64",
+    "fee_sol": "float64",
+    "block_time": "int64",
+    "action": "uint8",
+    "wallet": "uint32",
+    "mint": "uint32",
+}
+
+
+def utc_day(block_time):
+    return datetime.fromtimestamp(int(block_time), timezone.utc).strftime("%Y-%m-%d")
+
+
+class EventArchive:
+    """Senų įvykių archyvas, suskaidytas pagal UTC dienas.
+
+    Kiekviena diena - katalogas su stulpeliais: skaitiniai stulpeliai yra
+    nesuspausti .npy (kad būtų galima memory-map'inti), wallet/mint yra
+    žodyno (dictionary.json) indeksai, o signature'ai ir laiko eilutės
+    laikomi suspaustame strings.json.gz.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self.version = 0
+        self._count = (None, 0)
+
+    def _day_dir(self, day):
+        return os.path.join(self.root, f"day={day}")
+
+    def recover(self):
+        """Sutvarkyti po crash'o likusius laikinus katalogus"""
+        if not os.path.isdir(self.root):
+            return
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith(".tmp"):
+                shutil.rmtree(path, ignore_errors=True)
+            elif name.endswith(".old"):
+                final = path[:-len(".old")]
+                if os.path.isdir(final):
+                    shutil.rmtree(path, ignore_errors=True)
                 else:
-                    html += """
-                    <div style="padding: 40px; text-align: center;">
-                        <h2 style="color: #7f8c8d;">No transactions yet</h2>
-                        <p>Waiting for wallet activity...</p>
-                    </div>
-                    """
-                    
-            except Exception as e:
-                html += f"""
-                <div style="padding: 40px; text-align: center; color: #e74c3c;">
-                    <h2>Error loading data</h2>
-                    <p>{str(e)}</p>
+                    os.replace(path, final)
+
+    def days(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name[4:] for name in os.listdir(self.root)
+                      if name.startswith("day=") and not name.endswith((".tmp", ".old")))
+
+    # --- skaitymas ---
+    def load_day(self, day, mmap=True):
+        """Dienos skaitiniai stulpeliai (memory-mapped)"""
+        path = self._day_dir(day)
+        return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                for name in ARCHIVE_NUMERIC_COLUMNS}
+
+    @staticmethod
+    def _row(columns, strings, i):
+        code = int(columns["action"][i])
+        return {
+            "timestamp_local": strings["timestamp_local"][i],
+            "wallet": strings["wallets"][int(columns["wallet"][i])],
+            "signature": strings["signatures"][i],
+            "action": ARCHIVE_ACTIONS[code] if code < len(ARCHIVE_ACTIONS) else "",
+            "mint": strings["mints"][int(columns["mint"][i])],
+            "amount": float(columns["amount"][i]),
+            "fee_sol": float(columns["fee_sol"][i]),
+            "block_time": int(columns["block_time"][i]),
+        }
+
+    def load_dictionary(self, day):
+        """Tik wallet/mint žodynai - pakanka filtravimui"""
+        with open(os.path.join(self._day_dir(day), "dictionary.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def load_strings(self, day):
+        """Žodynai kartu su signature'ais ir laiko eilutėmis"""
+        strings = self.load_dictionary(day)
+        with gzip.open(os.path.join(self._day_dir(day), "strings.json.gz"), "rt", encoding="utf-8") as f:
+            strings.update(json.load(f))
+        return strings
+
+    def _days_in_range(self, since=None, until=None):
+        first = utc_day(since) if since is not None else None
+        last = utc_day(until) if until is not None else None
+        return [d for d in self.days()
+                if (first is None or d >= first) and (last is None or d <= last)]
+
+    def _mask(self, day, columns, wallet=None, mint=None, action=None, since=None, until=None, strings=None):
+        mask = np.ones(len(columns["block_time"]), dtype=bool)
+        if wallet is not None or mint is not None:
+            strings = strings or self.load_dictionary(day)
+            for key, value in (("wallet", wallet), ("mint", mint)):
+                if value is None:
+                    continue
+                try:
+                    mask &= columns[key] == strings[key + "s"].index(value)
+                except ValueError:
+                    return None
+        if action is not None:
+            if action not in ARCHIVE_ACTIONS:
+                return None
+            mask &= columns["action"] == ARCHIVE_ACTIONS.index(action)
+        if since is not None:
+            mask &= columns["block_time"] >= since
+        if until is not None:
+            mask &= columns["block_time"] <= until
+        return mask
+
+    def count(self):
+        """Įvykių skaičius archyve (iš block_time stulpelių), cache'inamas pagal versiją"""
+        version = self.version
+        if self._count[0] != version:
+            total = sum(len(np.load(os.path.join(self._day_dir(day), "block_time.npy"), mmap_mode="r"))
+                        for day in self.days())
+            self._count = (version, total)
+        return self._count[1]
+
+    def iter_events(self, wallet=None, mint=None, action=None, since=None, until=None):
+        """Archyvo įvykiai kaip dict'ai, naujausios dienos pirmos"""
+        for day in reversed(self._days_in_range(since, until)):
+            columns = self.load_day(day)
+            strings = self.load_strings(day)
+            mask = self._mask(day, columns, wallet, mint, action, since, until, strings)
+            if mask is None:
+                continue
+            for i in np.flatnonzero(mask)[::-1]:
+                yield self._row(columns, strings, i)
+
+    def stats(self, wallet=None, mint=None, since=None, until=None, amount_bins=12):
+        """Vektorizuotos sumos ir histogramos per archyvo dienas"""
+        totals = {"events": 0, "buys": 0, "sells": 0, "bought": 0.0, "sold": 0.0, "fees_sol": 0.0}
+        per_day = []
+        hour_of_day = np.zeros(24, dtype=np.int64)
+        amount_hist = np.zeros(amount_bins, dtype=np.int64)
+        amount_edges = np.logspace(-3, -3 + amount_bins, amount_bins + 1)
+        for day in self._days_in_range(since, until):
+            columns = self.load_day(day)
+            mask = self._mask(day, columns, wallet, mint, None, since, until)
+            if mask is None or not mask.any():
+                continue
+            amount = columns["amount"][mask]
+            action = columns["action"][mask]
+            block_time = columns["block_time"][mask]
+            buys = action == 0
+            sells = action == 1
+            day_totals = {
+                "day": day,
+                "events": int(mask.sum()),
+                "buys": int(buys.sum()),
+                "sells": int(sells.sum()),
+                "bought": float(amount[buys].sum()),
+                "sold": float(amount[sells].sum()),
+                "fees_sol": float(columns["fee_sol"][mask].sum()),
+            }
+            per_day.append(day_totals)
+            for key in totals:
+                totals[key] += day_totals[key]
+            hour_of_day += np.bincount((block_time % 86400) // 3600, minlength=24)[:24]
+            amount_hist += np.histogram(amount, bins=amount_edges)[0]
+        return {
+            "totals": totals,
+            "per_day": per_day,
+            "hour_of_day": hour_of_day.tolist(),
+            "amount_histogram": {"edges": amount_edges.tolist(), "counts": amount_hist.tolist()},
+        }
+
+    # --- rašymas ---
+    def append(self, events):
+        """Įrašyti įvykius į dienų particijas (pasikartojantys praleidžiami)"""
+        by_day = {}
+        for event in events:
+            by_day.setdefault(utc_day(event["block_time"]), []).append(event)
+        written = 0
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            for day, day_events in sorted(by_day.items()):
+                written += self._merge_day(day, day_events)
+            self.version += 1
+        return written
+
+    def _merge_day(self, day, new_events):
+        path = self._day_dir(day)
+        rows = []
+        if os.path.isdir(path):
+            rows = self._read_day_rows(day)
+        known = {(r["signature"], r["mint"]) for r in rows}
+        added = 0
+        for event in new_events:
+            key = (event["signature"], event["mint"])
+            if key not in known:
+                known.add(key)
+                rows.append(event)
+                added += 1
+        if not added:
+            return 0
+        rows.sort(key=lambda r: r["block_time"])
+        self._write_day(day, rows)
+        return added
+
+    def _read_day_rows(self, day):
+        columns = self.load_day(day, mmap=False)
+        strings = self.load_strings(day)
+        return [self._row(columns, strings, i) for i in range(len(columns["block_time"]))]
+
+    def _write_day(self, day, rows):
+        final = self._day_dir(day)
+        tmp = final + ".tmp"
+        old = final + ".old"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        wallets, mints = {}, {}
+        columns = {
+            "amount": [r["amount"] for r in rows],
+            "fee_sol": [r["fee_sol"] for r in rows],
+            "block_time": [r["block_time"] for r in rows],
+            "action": [ARCHIVE_ACTIONS.index(r["action"]) if r["action"] in ARCHIVE_ACTIONS else 255 for r in rows],
+            "wallet": [wallets.setdefault(r["wallet"], len(wallets)) for r in rows],
+            "mint": [mints.setdefault(r["mint"], len(mints)) for r in rows],
+        }
+        for name, dtype in ARCHIVE_NUMERIC_COLUMNS.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.asarray(columns[name], dtype=dtype))
+        with open(os.path.join(tmp, "dictionary.json"), "w", encoding="utf-8") as f:
+            json.dump({"wallets": list(wallets), "mints": list(mints)}, f, separators=(",", ":"))
+        with gzip.open(os.path.join(tmp, "strings.json.gz"), "wt", encoding="utf-8") as f:
+            json.dump({
+                "signatures": [r["signature"] for r in rows],
+                "timestamp_local": [r["timestamp_local"] for r in rows],
+            }, f, separators=(",", ":"))
+
+        if os.path.isdir(final):
+            os.replace(final, old)
+        os.replace(tmp, final)
+        shutil.rmtree(old, ignore_errors=True)
+
+
+EVENT_ARCHIVE = EventArchive(ARCHIVE_DIR)
+
+
+def total_event_count():
+    """Karštas store'as kartu su archyvu"""
+    return len(EVENT_STORE) + (EVENT_ARCHIVE.count() if HAS_NUMPY else 0)
+
+
+def roll_archive():
+    """Perkelti senesnius nei ARCHIVE_AFTER_DAYS įvykius iš CSV į archyvą"""
+    cutoff = int(time.time()) - ARCHIVE_AFTER_DAYS * 86400
+    old_events = EVENT_STORE.older_than(cutoff)
+    if not old_events:
+        return 0
+    # Pirma archyvas (pasikartojimai praleidžiami), tik tada valomas karštas store'as.
+    # Šalinami tik archyvuoti įvykiai - sink'as per tą laiką galėjo įrašyti
+    # naujų įvykių su senu block_time (pvz. ką tik pridėto wallet'o istorija).
+    EVENT_ARCHIVE.append(old_events)
+    with CSV_LOCK:
+        removed = EVENT_STORE.remove_events(old_events)
+        rewrite_csv(EVENT_STORE.iter_query())
+    LOG.info("🗄️ Archived %d events older than %d days", removed, ARCHIVE_AFTER_DAYS)
+    return removed
+
+
+def archive_roller():
+    """Fono gija, periodiškai perkelianti senus įvykius į archyvą"""
+    while True:
+        try:
+            roll_archive()
+        except Exception as e:
+            LOG.error("❌ Archive roll error: %s", e)
+        time.sleep(ARCHIVE_INTERVAL)
+
+# ---------------- ADRESŲ PAIEŠKA ----------------
+ADDRESS_KINDS = (("wallet", 1), ("mint", 2), ("signature", 4))
+
+
+class AddressIndex:
+    """Prefiksų paieška per wallet'us, mint'us ir signature'us.
+
+    Raktai laikomi address_key() baitais KeySet'uose (32 B adresams, 64 B
+    signature'ams) - be string'ų ir be objekto kiekvienam signature'ui.
+    Prefiksas verčiamas baitų intervalais (b58_prefix_ranges), todėl paieška
+    lieka dvejetainė, o į base58 koduojami tik rasti rezultatai.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds = {}
+        self._addresses = KeySet(32)
+        self._signatures = KeySet(64)
+
+    def __len__(self):
+        return len(self._kinds) + len(self._signatures)
+
+    def add(self, value, kind):
+        if not value:
+            return
+        key = address_key(value) if isinstance(value, str) else value
+        with self._lock:
+            if kind == "signature":
+                self._signatures.add(key)
+                return
+            known = self._kinds.get(key)
+            self._kinds[key] = (known or 0) | dict(ADDRESS_KINDS)[kind]
+            if known is None:
+                self._addresses.add(key)
+
+    def add_event(self, event):
+        self.add(event.get("wallet"), "wallet")
+        self.add(event.get("mint"), "mint")
+        self.add(event.signature_key, "signature")
+
+    def bulk_add(self, values, kind):
+        """Daug įrašų iš karto (paleidimo metu) - vienas suliejimas"""
+        keys = [address_key(value) if isinstance(value, str) else value for value in values if value]
+        with self._lock:
+            if kind == "signature":
+                self._signatures.update(keys)
+                return
+            bit = dict(ADDRESS_KINDS)[kind]
+            new = []
+            for key in keys:
+                known = self._kinds.get(key)
+                if known is None:
+                    new.append(key)
+                self._kinds[key] = (known or 0) | bit
+            self._addresses.update(new)
+
+    def search(self, prefix, limit=20):
+        """Iki limit reikšmių, prasidedančių prefix (surikiuotos)"""
+        found = []
+        with self._lock:
+            for keys in (self._addresses, self._signatures):
+                for lo, hi in b58_prefix_ranges(prefix, keys.width):
+                    found.extend(keys.between(lo, hi, limit))
+                found.extend(key for key in keys.others() if key.startswith(prefix))
+            kinds = [self._kinds.get(key) for key in found]
+        results = sorted((key_to_str(key), bits) for key, bits in zip(found, kinds))[:limit]
+        return [(value, [name for name, bit in ADDRESS_KINDS if bit & bits] if bits else ["signature"])
+                for value, bits in results]
+
+
+ADDRESS_INDEX = AddressIndex()
+
+
+def build_address_index():
+    """Užpildyti paieškos indeksą iš store'o, archyvo ir stebimų wallet'ų"""
+    events = EVENT_STORE.events_after(None, None)
+    ADDRESS_INDEX.bulk_add((e["wallet"] for e in events), "wallet")
+    ADDRESS_INDEX.bulk_add(VALID_WALLETS, "wallet")
+    ADDRESS_INDEX.bulk_add((e["mint"] for e in events), "mint")
+    ADDRESS_INDEX.bulk_add((e.signature_key for e in events), "signature")
+    if HAS_NUMPY:
+        for day in EVENT_ARCHIVE.days():
+            strings = EVENT_ARCHIVE.load_strings(day)
+            ADDRESS_INDEX.bulk_add(strings["wallets"], "wallet")
+            ADDRESS_INDEX.bulk_add(strings["mints"], "mint")
+            ADDRESS_INDEX.bulk_add(strings["signatures"], "signature")
+    return len(ADDRESS_INDEX)
+
+# ---------------- BŪSENOS SNAPSHOT'AS ----------------
+def save_state_snapshot(seen):
+    """Išsaugoti kompaktišką būseną greitam paleidimui (gzip JSON)"""
+    seen.commit()
+    data = {
+        "version": 1,
+        "saved_at": time.time(),
+        "wallets": list(VALID_WALLETS),
+        "cursors": seen.cursor_snapshot(),
+        "recent_events": [{k: v for k, v in e.items() if k != "seq"}
+                          for e in reversed(EVENT_STORE.latest(STATE_RECENT_EVENTS))],
+        "aggregates": FLOW_AGGREGATES.to_snapshot(),
+    }
+    tmp_path = f"{STATE_FILE}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(gzip.compress(json.dumps(data).encode("utf-8"), compresslevel=1))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, STATE_FILE)
+        return True
+    except Exception as e:
+        LOG.error("❌ State snapshot save error: %s", e)
+        return False
+
+
+def load_state_snapshot():
+    """Perskaityti būsenos snapshot'ą; None jei jo nėra ar jis sugadintas"""
+    if not os.path.exists(STATE_FILE):
+        return None
+    try:
+        with open(STATE_FILE, "rb") as f:
+            data = json.loads(gzip.decompress(f.read()))
+        return data if data.get("version") == 1 else None
+    except Exception as e:
+        LOG.error("❌ State snapshot load error: %s", e)
+        return None
+
+
+def state_snapshotter(seen):
+    """Fono gija, periodiškai išsauganti būsenos snapshot'ą"""
+    saved = None
+    while True:
+        time.sleep(STATE_SNAPSHOT_INTERVAL)
+        current = (EVENT_STORE.version, WALLETS_VERSION, FLOW_AGGREGATES.version,
+                   tuple(sorted(seen.cursor_snapshot().items())))
+        if current != saved and save_state_snapshot(seen):
+            saved = current
+
+
+def _mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else 0
+
+
+def fast_start():
+    """Atkurti būseną iš vieno snapshot'o - poller'is gali startuoti iš karto.
+
+    Grąžina (seen, live_from_seq, aggregates_key): seen turi tik cursor'ius, pilnas
+    įkėlimas vyksta finish_startup() gijoje.
+    """
+    global VALID_WALLETS
+    state = load_state_snapshot() or {}
+    saved_at = state.get("saved_at", 0)
+    # Rankiniu būdu pakeistas wallet'ų failas turi pirmenybę prieš snapshot'ą
+    if state.get("wallets") is not None and saved_at >= _mtime(WALLETS_FILE):
+        VALID_WALLETS = [sys.intern(w) for w in state["wallets"] if validate_wallet_address(w)]
+    else:
+        VALID_WALLETS = get_valid_wallets()
+    if not VALID_WALLETS:
+        LOG.warning("❌ No valid wallets! Adding default ones...")
+        VALID_WALLETS = ["4Vgu5AHT1ndczhdgqAipNDqLsCPjBS5jMXkEg8yzhT9c"]
+        save_wallets(VALID_WALLETS)
+
+    # Po seen kompaktavimo žurnale nebėra senesnių cursor'ių - tada snapshot'o
+    # cursor'iai gali būti pasenę ir wallet'ai laukia pilno seen įkėlimo
+    cursors = state.get("cursors") or {}
+    if saved_at < _mtime(SEEN_FILE):
+        cursors = {}
+    seen = SeenJournal(SEEN_FILE, SEEN_JOURNAL_FILE).fast_start(cursors)
+
+    EVENT_STORE.replace_all(normalize_event(e) for e in state.get("recent_events") or ())
+    if state.get("aggregates"):
+        FLOW_AGGREGATES.load_snapshot(state["aggregates"])
+    # sink_event perrašys last_key, todėl snapshot'o raktas išsaugomas dabar
+    return seen, EVENT_STORE.max_seq(), FLOW_AGGREGATES.last_key
+
+
+def finish_startup(seen, live_from_seq, aggregates_key):
+    """Fono gija: pilnas seen, CSV, archyvas, agregatai ir paieškos indeksas"""
+    started = time.time()
+    try:
+        init_csv()
+        seen.load()
+        threading.Thread(target=seen_compactor, args=(seen,), daemon=True).start()
+        LOG.info("✅ Loaded %d cached mint metadata entries", MINT_METADATA.load())
+        if HAS_NUMPY:
+            EVENT_ARCHIVE.recover()
+        else:
+            LOG.warning("⚠️ numpy not installed - event archive disabled")
+
+        # sink_event rašo CSV ir store'ą po tuo pačiu lock'u, todėl CSV jau
+        # turi ir poller'io spėtus pridėti įvykius
+        with CSV_LOCK:
+            live = {(e["signature"], e["mint"]) for e in EVENT_STORE.events_since_seq(live_from_seq)}
+            EVENT_STORE.replace_all(read_csv_events(CSV_FILE))
+        LOG.info("✅ Loaded %d events into memory", len(EVENT_STORE))
+
+        # Agregatams pritaikyti tik įvykius po snapshot'o, kurių poller'is dar nepridėjo
+        missing = None
+        if aggregates_key:
+            missing = EVENT_STORE.events_after(*aggregates_key)
+        if missing is None:
+            sources = [EVENT_STORE.events_after(None, None)]
+            if HAS_NUMPY:
+                sources.insert(0, EVENT_ARCHIVE.iter_events())
+            LOG.info("🔁 Rebuilt aggregates from %d events", FLOW_AGGREGATES.rebuild(*sources))
+        else:
+            missing = [e for e in missing if (e["signature"], e["mint"]) not in live]
+            for event in missing:
+                FLOW_AGGREGATES.add(event)
+            LOG.info("✅ Aggregates ready (%d events applied since snapshot)", len(missing))
+
+        LOG.info("✅ Search index: %d addresses", build_address_index())
+        if HAS_NUMPY:
+            threading.Thread(target=archive_roller, daemon=True).start()
+        threading.Thread(target=state_snapshotter, args=(seen,), daemon=True).start()
+        LOG.info("✅ Startup finished in %.2fs", time.time() - started)
+    except Exception as e:
+        LOG.error("❌ Startup error: %s", e)
+        if not seen.loaded.is_set():
+            seen.load()
+
+# ---------------- WEB DASHBOARD SU WALLET PRIDĖJIMU ----------------
+DASHBOARD_CSS = """\
+* {
+    margin: 0;
+    padding: 0;
+    box-sizing: border-box;
+}
+body { 
+    font-family: 'Segoe UI', Arial, sans-serif; 
+    margin: 0; 
+    padding: 20px; 
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    min-height: 100vh;
+}
+.container {
+    max-width: 1400px;
+    margin: 0 auto;
+    background: white;
+    border-radius: 15px;
+    box-shadow: 0 10px 30px rgba(0,0,0,0.2);
+    overflow: hidden;
+}
+.header {
+    background: linear-gradient(135deg, #2c3e50 0%, #3498db 100%);
+    color: white;
+    padding: 30px;
+    text-align: center;
+}
+.header h1 {
+    margin: 0;
+    font-size: 2.5em;
+    font-weight: 300;
+}
+.stats {
+    display: grid;
+    grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+    gap: 20px;
+    padding: 20px;
+    background: #f8f9fa;
+}
+.stat-card {
+    background: white;
+    padding: 20px;
+    border-radius: 10px;
+    text-align: center;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+}
+.stat-number {
+    font-size: 2em;
+    font-weight: bold;
+    color: #2c3e50;
+}
+.stat-label {
+    color: #7f8c8d;
+    font-size: 0.9em;
+}
+.wallet-management {
+    background: #e3f2fd;
+    padding: 20px;
+    margin: 20px;
+    border-radius: 10px;
+    border: 2px solid #2196f3;
+    max-width: 100%;
+    overflow: hidden;
+}
+.wallet-form {
+    display: flex;
+    gap: 10px;
+    align-items: end;
+    margin-bottom: 15px;
+    flex-wrap: wrap;
+}
+.wallet-input {
+    flex: 1;
+    min-width: 300px;
+}
+.wallet-input label {
+    display: block;
+    margin-bottom: 5px;
+    font-weight: bold;
+    color: #2c3e50;
+}
+.wallet-input input {
+    width: 100%;
+    padding: 12px;
+    border: 2px solid #bdc3c7;
+    border-radius: 8px;
+    font-size: 16px;
+    transition: border-color 0.3s;
+    font-family: monospace;
+}
+.wallet-input input:focus {
+    border-color: #3498db;
+    outline: none;
+}
+.add-btn {
+    padding: 12px 24px;
+    background: #27ae60;
+    color: white;
+    border: none;
+    border-radius: 8px;
+    cursor: pointer;
+    font-size: 16px;
+    transition: background 0.3s;
+    white-space: nowrap;
+}
+.add-btn:hover {
+    background: #219a52;
+}
+.current-wallets {
+    margin-top: 20px;
+}
+.wallet-list {
+    display: grid;
+    grid-template-columns: repeat(auto-fill, minmax(350px, 1fr));
+    gap: 12px;
+    margin-top: 10px;
+}
+.wallet-item {
+    background: white;
+    padding: 12px 15px;
+    border-radius: 8px;
+    border: 1px solid #ecf0f1;
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    transition: transform 0.2s;
+}
+.wallet-item:hover {
+    transform: translateY(-2px);
+    box-shadow: 0 4px 8px rgba(0,0,0,0.15);
+}
+.wallet-address {
+    flex: 1;
+    font-family: 'Courier New', monospace;
+    font-size: 13px;
+    word-break: break-all;
+    color: #2c3e50;
+    font-weight: 500;
+}
+.remove-btn {
+    background: #e74c3c;
+    color: white;
+    border: none;
+    padding: 6px 12px;
+    border-radius: 5px;
+    cursor: pointer;
+    font-size: 12px;
+    margin-left: 10px;
+    white-space: nowrap;
+    transition: background 0.3s;
+}
+.remove-btn:hover {
+    background: #c0392b;
+}
+.table-container {
+    overflow-x: auto;
+    padding: 20px;
+}
+table {
+    width: 100%;
+    border-collapse: collapse;
+    margin: 20px 0;
+    font-size: 0.85em;
+    min-width: 1200px;
+}
+th {
+    background: #34495e;
+    color: white;
+    padding: 12px 8px;
+    text-align: left;
+    font-weight: 600;
+    position: sticky;
+    top: 0;
+}
+td {
+    padding: 10px 8px;
+    border-bottom: 1px solid #ecf0f1;
+    max-width: 200px;
+    overflow: hidden;
+    text-overflow: ellipsis;
+    white-space: nowrap;
+}
+tr:hover {
+    background: #f8f9fa;
+}
+.buy { 
+    color: #27ae60; 
+    font-weight: bold;
+}
+.sell { 
+    color: #e74c3c; 
+    font-weight: bold;
+}
+.transfer {
+    color: #95a5a6;
+}
+.search-box {
+    padding: 0 20px 10px;
+}
+.search-box input {
+    width: 100%;
+    padding: 10px;
+    border: 2px solid #bdc3c7;
+    border-radius: 8px;
+    font-family: monospace;
+    font-size: 14px;
+}
+.search-result {
+    padding: 4px 0;
+    font-family: 'Courier New', monospace;
+    font-size: 0.85em;
+    word-break: break-all;
+}
+.search-kind {
+    display: inline-block;
+    min-width: 110px;
+    color: #7f8c8d;
+}
+.top-mints {
+    padding: 0 20px;
+}
+.top-mints ol {
+    margin: 10px 0 0 25px;
+    font-family: 'Courier New', monospace;
+    font-size: 0.9em;
+    color: #2c3e50;
+}
+.top-mints li {
+    padding: 3px 0;
+}
+.latency {
+    padding: 0 20px;
+}
+.latency table {
+    min-width: 0;
+    margin: 10px 0;
+}
+.refresh-info {
+    text-align: center;
+    padding: 10px;
+    background: #ecf0f1;
+    color: #7f8c8d;
+    font-size: 0.9em;
+}
+.address-cell {
+    cursor: pointer;
+    position: relative;
+    max-width: 180px;
+}
+.copy-btn {
+    background: #3498db;
+    color: white;
+    border: none;
+    padding: 3px 8px;
+    border-radius: 3px;
+    cursor: pointer;
+    font-size: 0.75em;
+    margin-left: 5px;
+    transition: background 0.2s;
+}
+.copy-btn:hover {
+    background: #2980b9;
+}
+.timestamp {
+    min-width: 140px;
+}
+.action {
+    min-width: 70px;
+    text-align: center;
+}
+.amount {
+    min-width: 100px;
+    text-align: right;
+}
+.fee {
+    min-width: 90px;
+    text-align: right;
+}
+@media (max-width: 768px) {
+    .container {
+        margin: 10px;
+        border-radius: 10px;
+    }
+    .header {
+        padding: 20px;
+    }
+    .header h1 {
+        font-size: 2em;
+    }
+    .stats {
+        grid-template-columns: repeat(2, 1fr);
+        padding: 15px;
+        gap: 15px;
+    }
+    .table-container {
+        padding: 10px;
+    }
+    .wallet-management {
+        margin: 10px;
+        padding: 15px;
+    }
+    .wallet-form {
+        flex-direction: column;
+    }
+    .wallet-input {
+        min-width: 100%;
+    }
+    .wallet-list {
+        grid-template-columns: 1fr;
+    }
+    .wallet-item {
+        flex-direction: column;
+        align-items: flex-start;
+        gap: 10px;
+    }
+    .remove-btn {
+        align-self: flex-end;
+    }
+}
+@media (max-width: 480px) {
+    .wallet-address {
+        font-size: 12px;
+    }
+    .wallet-list {
+        grid-template-columns: 1fr;
+    }
+}
+"""
+
+DASHBOARD_JS = """\
+// Auto-refresh every 5 seconds (ne kol naudojama paieška)
+setInterval(() => {
+    const search = document.getElementById('search-input');
+    if (!search || !search.value) location.reload();
+}, 5000);
+
+// Prefix search over wallets, mints and signatures
+let searchTimer = null;
+function searchAddresses(q) {
+    clearTimeout(searchTimer);
+    const box = document.getElementById('search-results');
+    if (q.length < 2) {
+        box.innerHTML = '';
+        return;
+    }
+    searchTimer = setTimeout(() => {
+        fetch('/api/search?limit=20&q=' + encodeURIComponent(q))
+            .then(r => r.json())
+            .then(data => {
+                box.innerHTML = '';
+                (data.results || []).forEach(item => {
+                    const row = document.createElement('div');
+                    row.className = 'search-result';
+                    const kind = item.kinds[0];
+                    const link = document.createElement('a');
+                    link.href = '/api/events?' + kind + '=' + encodeURIComponent(item.value);
+                    link.textContent = item.value;
+                    const info = document.createElement('span');
+                    info.className = 'search-kind';
+                    info.textContent = item.kinds.join(', ') + (item.symbol ? ' · ' + item.symbol : '');
+                    row.appendChild(info);
+                    row.appendChild(link);
+                    box.appendChild(row);
+                });
+                if (!box.children.length) box.textContent = 'No matches';
+            });
+    }, 150);
+}
+
+// Copy to clipboard function
+function copyToClipboard(text) {
+    navigator.clipboard.writeText(text).then(function() {
+        showNotification('✓ Copied to clipboard!', 'success');
+    }).catch(function(err) {
+        console.error('Could not copy text: ', err);
+        showNotification('❌ Copy failed', 'error');
+    });
+}
+
+// Remove wallet function
+function removeWallet(wallet) {
+    if (confirm('Are you sure you want to remove this wallet?')) {
+        fetch('/remove-wallet', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/x-www-form-urlencoded',
+            },
+            body: 'wallet=' + encodeURIComponent(wallet)
+        }).then(response => {
+            location.reload();
+        });
+    }
+}
+
+// Show notification
+function showNotification(message, type) {
+    const notification = document.createElement('div');
+    notification.style.cssText = `
+        position: fixed;
+        top: 20px;
+        right: 20px;
+        background: ${type === 'success' ? '#27ae60' : '#e74c3c'};
+        color: white;
+        padding: 12px 24px;
+        border-radius: 5px;
+        z-index: 10000;
+        font-size: 14px;
+        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+    `;
+    notification.textContent = message;
+    document.body.appendChild(notification);
+
+    setTimeout(() => {
+        document.body.removeChild(notification);
+    }, 3000);
+}
+"""
+
+class CompiledTemplate:
+    """Šablonas, kurio {{vardai}} išskaidomi tik vieną kartą"""
+
+    def __init__(self, text):
+        self._literals = []
+        self._names = []
+        pos = 0
+        while True:
+            start = text.find("{{", pos)
+            if start < 0:
+                break
+            end = text.index("}}", start)
+            self._literals.append(text[pos:start])
+            self._names.append(text[start + 2:end].strip())
+            pos = end + 2
+        self._tail = text[pos:]
+
+    def render(self, **ctx):
+        parts = []
+        for literal, name in zip(self._literals, self._names):
+            parts.append(literal)
+            parts.append(str(ctx[name]))
+        parts.append(self._tail)
+        return "".join(parts)
+
+
+PAGE_TEMPLATE = CompiledTemplate("""<!DOCTYPE html>
+<html>
+<head>
+    <title>Wallet CA Tracker</title>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <link rel="stylesheet" href="{{css_url}}">
+    <script src="{{js_url}}" defer></script>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>💰 Wallet CA Tracker</h1>
+            <p>Real-time Solana wallet transaction monitoring</p>
+            <p style="font-size: 0.8em; opacity: 0.8;">🚀 Hosted on Render.com</p>
+        </div>
+{{content}}
+        <div class="refresh-info">
+            🔄 Page auto-refreshes every 5 seconds | Made with Python | Hosted on Render.com
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+STATS_TEMPLATE = CompiledTemplate("""
+        <div class="stats">
+            <div class="stat-card">
+                <div class="stat-number">{{total_tx}}</div>
+                <div class="stat-label">Total Transactions</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-number">{{watched_wallets}}</div>
+                <div class="stat-label">Watched Wallets</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-number">{{active_wallets}}</div>
+                <div class="stat-label">Active Wallets</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-number">{{unique_tokens}}</div>
+                <div class="stat-label">Unique Tokens</div>
+            </div>
+            <div class="stat-card">
+                <div class="stat-number">{{trades_1h}}</div>
+                <div class="stat-label">Trades (1h)</div>
+            </div>
+        </div>
+""")
+
+SEARCH_HTML = """
+        <div class="search-box">
+            <h3>🔎 Search</h3>
+            <input type="text" id="search-input" autocomplete="off"
+                   placeholder="Wallet, token or signature prefix (e.g. 4Vgu5AHT)"
+                   oninput="searchAddresses(this.value.trim())">
+            <div id="search-results"></div>
+        </div>
+"""
+
+LAG_TEMPLATE = CompiledTemplate("""
+        <div class="latency">
+            <h3>⏱️ Detection Lag from Block Time (p50 / p95 / p99)</h3>
+            <table>
+                <thead>
+                    <tr>
+                        <th>Wallet</th>
+                        <th>Events</th>
+                        <th>Detected</th>
+                        <th>Persisted</th>
+                        <th>Notified</th>
+                    </tr>
+                </thead>
+                <tbody>{{rows}}
+                </tbody>
+            </table>
+        </div>
+""")
+
+LAG_ROW_TEMPLATE = CompiledTemplate("""
+                    <tr>
+                        <td class="address-cell">{{scope}}</td>
+                        <td>{{count}}</td>
+                        <td>{{detected}}</td>
+                        <td>{{persisted}}</td>
+                        <td>{{notified}}</td>
+                    </tr>""")
+
+TOP_MINTS_TEMPLATE = CompiledTemplate("""
+        <div class="top-mints">
+            <h3>🔥 Most Traded Tokens (1h)</h3>
+            <ol>{{items}}
+            </ol>
+        </div>
+""")
+
+TOP_MINT_ITEM_TEMPLATE = CompiledTemplate("""
+                <li>{{mint_short}} &mdash; {{trades}} trades <button class="copy-btn" onclick="copyToClipboard('{{mint}}')">Copy</button></li>""")
+
+WALLET_MANAGEMENT_TEMPLATE = CompiledTemplate("""
+        <div class="wallet-management">
+            <h3>🔧 Wallet Management</h3>
+            <form class="wallet-form" action="/add-wallet" method="post">
+                <div class="wallet-input">
+                    <label for="wallet">Add New Wallet:</label>
+                    <input type="text" id="wallet" name="wallet"
+                           placeholder="Enter Solana wallet address (44 characters)"
+                           required maxlength="44" pattern="[A-Za-z0-9]{44}"
+                           title="Solana wallet address must be exactly 44 characters">
                 </div>
-                """
-            
-            html += """
-                <div class="refresh-info">
-                    🔄 Page auto-refreshes every 5 seconds | Made with Python | Hosted on Render.com
+                <button type="submit" class="add-btn">➕ Add Wallet</button>
+            </form>
+
+            <div class="current-wallets">
+                <h4>Currently Watching (<span id="wallet-count">{{wallet_count}}</span> wallets):</h4>
+                <div class="wallet-list" id="wallet-list">{{wallet_items}}
                 </div>
             </div>
-            <script>
-                // Auto-refresh every 5 seconds
-                setTimeout(() => location.reload(), 5000);
-                
-                // Copy to clipboard function
-                function copyToClipboard(text) {
-                    navigator.clipboard.writeText(text).then(function() {
-                        showNotification('✓ Copied to clipboard!', 'success');
-                    }).catch(function(err) {
-                        console.error('Could not copy text: ', err);
-                        showNotification('❌ Copy failed', 'error');
-                    });
-                }
-                
-                // Remove wallet function
-                function removeWallet(wallet) {
-                    if (confirm('Are you sure you want to remove this wallet?')) {
-                        fetch('/remove-wallet', {
-                            method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/x-www-form-urlencoded',
-                            },
-                            body: 'wallet=' + encodeURIComponent(wallet)
-                        }).then(response => {
-                            location.reload();
-                        });
-                    }
-                }
-                
-                // Show notification
-                function showNotification(message, type) {
-                    const notification = document.createElement('div');
-                    notification.style.cssText = `
-                        position: fixed;
-                        top: 20px;
-                        right: 20px;
-                        background: ${type === 'success' ? '#27ae60' : '#e74c3c'};
-                        color: white;
-                        padding: 12px 24px;
-                        border-radius: 5px;
-                        z-index: 10000;
-                        font-size: 14px;
-                        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-                    `;
-                    notification.textContent = message;
-                    document.body.appendChild(notification);
-                    
-                    setTimeout(() => {
-                        document.body.removeChild(notification);
-                    }, 3000);
-                }
-            </script>
-            </body>
-            </html>
-            """
-            self.wfile.write(html.encode('utf-8'))
+        </div>
+""")
+
+WALLET_ITEM_TEMPLATE = CompiledTemplate("""
+                    <div class="wallet-item">
+                        <span class="wallet-address">{{wallet}}</span>
+                        <button class="remove-btn" onclick="removeWallet('{{wallet}}')">🗑️ Remove</button>
+                    </div>""")
+
+TX_TABLE_TEMPLATE = CompiledTemplate("""
+        <div class="table-container">
+            <h2 style="color: #2c3e50; margin-bottom: 20px;">Latest Transactions</h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>Time</th>
+                        <th>Wallet Address</th>
+                        <th>Action</th>
+                        <th>Amount</th>
+                        <th>Token CA Address</th>
+                        <th>Fee (SOL)</th>
+                        <th>Signature</th>
+                    </tr>
+                </thead>
+                <tbody>{{rows}}
+                </tbody>
+            </table>
+        </div>
+""")
+
+TX_ROW_TEMPLATE = CompiledTemplate("""
+                    <tr>
+                        <td class="timestamp">{{timestamp}}</td>
+                        <td class="address-cell">
+                            {{wallet_short}}
+                            <button class="copy-btn" onclick="copyToClipboard('{{wallet}}')">Copy</button>
+                        </td>
+                        <td class="action {{action_class}}">{{action}}</td>
+                        <td class="amount">{{amount}}</td>
+                        <td class="address-cell">
+                            {{mint_short}}
+                            <button class="copy-btn" onclick="copyToClipboard('{{mint}}')">Copy</button>
+                        </td>
+                        <td class="fee">{{fee}}</td>
+                        <td class="address-cell">
+                            {{signature_short}}
+                            <button class="copy-btn" onclick="copyToClipboard('{{signature}}')">Copy</button>
+                        </td>
+                    </tr>""")
+
+NO_TX_HTML = """
+        <div style="padding: 40px; text-align: center;">
+            <h2 style="color: #7f8c8d;">No transactions yet</h2>
+            <p>Waiting for wallet activity...</p>
+        </div>
+"""
+
+ERROR_TEMPLATE = CompiledTemplate("""
+        <div style="padding: 40px; text-align: center; color: #e74c3c;">
+            <h2>Error loading data</h2>
+            <p>{{error}}</p>
+        </div>
+""")
+
+ACTION_CLASSES = {'BUY': 'buy', 'SELL': 'sell', 'TRANSFER': 'transfer'}
+
+GZIP_MIN_SIZE = 512
+EXPORT_CHUNK_BYTES = 64 * 1024
+API_DEFAULT_LIMIT = 100
+API_MAX_LIMIT = 500
+SEARCH_MIN_PREFIX = 2
+BULK_MAX_BYTES = 5 * 1024 * 1024
+
+
+class StaticAsset:
+    """Statinis failas su iš anksto paskaičiuotu ETag ir gzip turiniu"""
+
+    def __init__(self, text, content_type):
+        self.body = text.encode("utf-8")
+        self.gzipped = gzip.compress(self.body, 9)
+        self.content_type = content_type
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:16] + '"'
+        self.url_version = self.etag.strip('"')
+
+
+STATIC_ASSETS = {
+    "/static/dashboard.css": StaticAsset(DASHBOARD_CSS, "text/css; charset=utf-8"),
+    "/static/dashboard.js": StaticAsset(DASHBOARD_JS, "application/javascript; charset=utf-8"),
+}
+
+STATIC_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PAGE_CACHE_CONTROL = "no-cache"
+
+
+def static_url(path):
+    """Statinio failo URL su versija, kad naršyklė galėtų jį laikyti kešuotą"""
+    return f"{path}?v={STATIC_ASSETS[path].url_version}"
+
+
+def short_address(value):
+    """Sutrumpintas adresas lentelei"""
+    return f"{value[:10]}...{value[-10:] if len(value) > 20 else ''}"
+
+
+def format_lag(percentiles):
+    """p50 / p95 / p99 sekundėmis"""
+    return " / ".join("–" if v is None else f"{v:.1f}s" for v in percentiles.values())
+
+
+def render_lag_row(scope, summary):
+    return LAG_ROW_TEMPLATE.render(
+        scope=scope,
+        count=summary["count"],
+        **{cp: format_lag(summary[cp]) for cp in DetectionLag.CHECKPOINTS},
+    )
+
+
+def mint_display(mint):
+    """Mint'o simbolis (jei žinomas) ir sutrumpintas adresas"""
+    meta = MINT_METADATA.get(mint)
+    if meta and meta.get("symbol"):
+        return f"<b>{html.escape(meta['symbol'])}</b> {short_address(mint)}"
+    return short_address(mint)
+
+
+def render_tx_row(row):
+    """Vienos transakcijos eilutė"""
+    try:
+        amount = float(row.get('amount', 0))
+        fee = float(row.get('fee_sol', 0))
+    except (ValueError, TypeError):
+        amount = 0
+        fee = 0
+
+    wallet = row.get('wallet', '')
+    mint = row.get('mint', '')
+    signature = row.get('signature', '')
+    action = row.get('action', '')
+    return TX_ROW_TEMPLATE.render(
+        timestamp=row.get('timestamp_local', ''),
+        wallet=wallet,
+        wallet_short=short_address(wallet),
+        action_class=ACTION_CLASSES.get(action, ''),
+        action=action,
+        amount=f"{amount:,.2f}",
+        mint=mint,
+        mint_short=mint_display(mint),
+        fee=f"{fee:.6f}",
+        signature=signature,
+        signature_short=short_address(signature),
+    )
+
+
+def render_dashboard():
+    """Sugeneruoti dashboard HTML iš sukompiliuotų šablonų"""
+    wallets = list(VALID_WALLETS)
+    try:
+        parts = [STATS_TEMPLATE.render(
+            total_tx=total_event_count(),
+            watched_wallets=len(wallets),
+            active_wallets=FLOW_AGGREGATES.active_wallet_count(),
+            unique_tokens=FLOW_AGGREGATES.mint_count(),
+            trades_1h=FLOW_AGGREGATES.window_trades(3600),
+        )]
+        lag = LAG_STATS.summary(top=10)
+        if lag["overall"]["count"]:
+            busiest = lag["wallets"].items()
+            parts.append(LAG_TEMPLATE.render(rows=render_lag_row("All wallets", lag["overall"]) + "".join(
+                render_lag_row(short_address(w), summary) for w, summary in busiest
+            )))
+        parts.append(SEARCH_HTML)
+        top_mints = FLOW_AGGREGATES.top_mints(3600, 5)
+        if top_mints:
+            parts.append(TOP_MINTS_TEMPLATE.render(items="".join(
+                TOP_MINT_ITEM_TEMPLATE.render(mint=m["mint"], mint_short=mint_display(m["mint"]), trades=m["trades"])
+                for m in top_mints
+            )))
+        parts.append(WALLET_MANAGEMENT_TEMPLATE.render(
+            wallet_count=len(wallets),
+            wallet_items="".join(WALLET_ITEM_TEMPLATE.render(wallet=w) for w in wallets),
+        ))
+
+        rows = EVENT_STORE.latest(50)
+        if rows:
+            parts.append(TX_TABLE_TEMPLATE.render(rows="".join(render_tx_row(row) for row in rows)))
+        else:
+            parts.append(NO_TX_HTML)
+        content = "".join(parts)
+    except Exception as e:
+        content = ERROR_TEMPLATE.render(error=html.escape(str(e)))
+
+    return PAGE_TEMPLATE.render(
+        css_url=static_url("/static/dashboard.css"),
+        js_url=static_url("/static/dashboard.js"),
+        content=content,
+    )
+
+
+# Proceso paleidimo žymė, kad ETag nesutaptų tarp restart'ų
+BOOT_ID = f"{time.time_ns():x}"
+
+
+def dashboard_etag():
+    """Puslapio ETag iš store ir wallet'ų versijų, be HTML generavimo"""
+    # Minutė įtraukta, nes slenkančių langų skaitikliai keičiasi ir be naujų įvykių
+    minute = int(time.time()) // 60
+    return (f'W/"{BOOT_ID}-{EVENT_STORE.version}-{WALLETS_VERSION}'
+            f'-{MINT_METADATA.version}-{LAG_STATS.version}-{minute:x}"')
+
+
+_page_cache = {"etag": None, "body": None, "gzipped": None}
+_page_cache_lock = threading.Lock()
+
+
+def cached_dashboard(etag):
+    """Grąžinti (body, gzipped) - pergeneruojama tik pasikeitus ETag"""
+    with _page_cache_lock:
+        if _page_cache["etag"] != etag:
+            body = render_dashboard().encode('utf-8')
+            _page_cache.update(etag=etag, body=body, gzipped=gzip.compress(body, 6))
+        return _page_cache["body"], _page_cache["gzipped"]
+
+
+def with_token(event):
+    """Įvykio kopija su mint metaduomenimis API atsakymui"""
+    meta = MINT_METADATA.get(event["mint"])
+    token = None
+    if meta:
+        token = {k: meta.get(k) for k in ("symbol", "name", "decimals", "supply")}
+    return dict(event, token=token)
+
+
+def export_chunks(events, fmt, chunk_bytes=EXPORT_CHUNK_BYTES):
+    """Sugrupuoti eksportuojamus įvykius į ~chunk_bytes dydžio tekstą"""
+    buf = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buf)
+        writer.writerow(CSV_HEADERS)
+    for event in events:
+        if fmt == "csv":
+            writer.writerow([event.get(k, "") if event.get(k) is not None else "" for k in CSV_HEADERS])
+        else:
+            buf.write(json.dumps({k: event.get(k) for k in CSV_HEADERS}, separators=(",", ":")))
+            buf.write("\n")
+        if buf.tell() >= chunk_bytes:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+class CSVHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        """Prieigos eilutės per logger'io eilę, ne sinchroniškai į stderr"""
+        HTTP_LOG.info("%s " + format, self.address_string(), *args)
+
+    def log_error(self, format, *args):
+        HTTP_LOG.warning("%s " + format, self.address_string(), *args)
+
+    def accepts_gzip(self):
+        return "gzip" in self.headers.get("Accept-Encoding", "")
+
+    def not_modified(self, etag):
+        """Patikrinti If-None-Match ir, jei sutampa, išsiųsti 304"""
+        inm = self.headers.get("If-None-Match")
+        if not inm or etag not in [t.strip() for t in inm.split(",")]:
+            return False
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+        return True
+
+    def send_body(self, body, content_type, status=200, etag=None,
+                  cache_control=None, gzipped=None):
+        """Išsiųsti atsakymą su gzip (jei klientas priima) ir cache antraštėmis"""
+        if self.accepts_gzip() and len(body) >= GZIP_MIN_SIZE:
+            body = gzipped if gzipped is not None else gzip.compress(body, 6)
+            encoding = "gzip"
+        else:
+            encoding = None
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if etag:
+            self.send_header('ETag', etag)
+        if cache_control:
+            self.send_header('Cache-Control', cache_control)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def send_json(self, obj, status=200):
+        body = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+        self.send_body(body, 'application/json', status=status, cache_control='no-store')
+
+    def api_events(self, query):
+        """GET /api/events - filtruojami įvykiai su cursor puslapiavimu
+
+        Pirma karštas store'as (cursor - seq), o jam pasibaigus tęsiama
+        archyve (cursor - "a<poslinkis>"), todėl matomi ir suarchyvuoti įvykiai.
+        """
+        def param(name):
+            value = query.get(name, [''])[0].strip()
+            return value or None
+
+        cursor = param('cursor')
+        archive_offset = None
+        try:
+            since = int(param('since')) if param('since') else None
+            until = int(param('until')) if param('until') else None
+            if cursor and cursor.startswith('a'):
+                archive_offset, cursor = int(cursor[1:]), None
+            else:
+                cursor = int(cursor) if cursor else None
+            limit = min(max(int(param('limit') or API_DEFAULT_LIMIT), 1), API_MAX_LIMIT)
+        except ValueError:
+            self.send_json({"error": "since, until, cursor and limit must be integers"}, status=400)
+            return
+        action = param('action')
+        signature = param('signature')
+        filters = dict(wallet=param('wallet'), mint=param('mint'),
+                       action=action.upper() if action else None, since=since, until=until)
+        events, next_cursor = [], None
+        if archive_offset is None:
+            events, next_cursor = EVENT_STORE.query(signature=signature, cursor=cursor, limit=limit, **filters)
+            if next_cursor is None:
+                archive_offset = 0
+        if archive_offset is not None and HAS_NUMPY:
+            # Vienu daugiau - kad žinotume, ar yra kitas puslapis
+            take = limit - len(events)
+            archived = (e for e in EVENT_ARCHIVE.iter_events(**filters)
+                        if signature is None or e["signature"] == signature)
+            rows = list(itertools.islice(archived, archive_offset, archive_offset + take + 1))
+            if len(rows) > take:
+                next_cursor = f"a{archive_offset + take}"
+            events += rows[:take]
+        self.send_json({"events": [with_token(e) for e in events], "next_cursor": next_cursor})
+
+    def api_positions(self, query):
+        """GET /api/positions?wallet=...[&mint=...] - O(1) pozicijos paieška"""
+        wallet = query.get('wallet', [''])[0].strip()
+        mint = query.get('mint', [''])[0].strip()
+        if not wallet:
+            self.send_json({"error": "wallet is required"}, status=400)
+            return
+        if mint:
+            position = FLOW_AGGREGATES.position(wallet, mint)
+            if position is None:
+                self.send_json({"error": "no activity for this wallet and mint"}, status=404)
+            else:
+                self.send_json(position)
+        else:
+            self.send_json({"positions": FLOW_AGGREGATES.wallet_positions(wallet)})
+
+    def api_top_mints(self, query):
+        """GET /api/top-mints?window=3600&limit=10"""
+        try:
+            window = int(query.get('window', ['3600'])[0])
+            limit = min(max(int(query.get('limit', ['10'])[0]), 1), API_MAX_LIMIT)
+            top = FLOW_AGGREGATES.top_mints(window, limit)
+        except ValueError as e:
+            self.send_json({"error": str(e)}, status=400)
+            return
+        for item in top:
+            meta = MINT_METADATA.get(item["mint"])
+            item["symbol"] = meta.get("symbol") if meta else None
+        self.send_json({"window": window, "mints": top})
+
+    def write_chunk(self, data, chunked=True):
+        if data:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data) if chunked else data)
+
+    def export_events(self, query):
+        """GET /export?format=csv|ndjson&wallet=&mint=&action=&since=&until=[&archive=1]
+
+        Įvykiai srautu su chunked transfer encoding (ir gzip, jei klientas priima).
+        HTTP/1.0 klientams kūnas siunčiamas be rėmelių, pabaigą žymi uždarytas ryšys.
+        """
+        def param(name):
+            value = query.get(name, [''])[0].strip()
+            return value or None
+
+        fmt = (param('format') or 'csv').lower()
+        if fmt not in ('csv', 'ndjson'):
+            self.send_json({"error": "format must be csv or ndjson"}, status=400)
+            return
+        try:
+            since = int(param('since')) if param('since') else None
+            until = int(param('until')) if param('until') else None
+        except ValueError:
+            self.send_json({"error": "since and until must be integers"}, status=400)
+            return
+        action = param('action')
+        filters = dict(wallet=param('wallet'), mint=param('mint'),
+                       action=action.upper() if action else None, since=since, until=until)
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if self.accepts_gzip() else None
+
+        # Chunked atsakymui reikia HTTP/1.1; po eksporto ryšys uždaromas
+        chunked = self.request_version != "HTTP/1.0"
+        if chunked:
+            self.protocol_version = "HTTP/1.1"
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv; charset=utf-8' if fmt == 'csv' else 'application/x-ndjson')
+        self.send_header('Content-Disposition', f'attachment; filename="wallet_ca_events.{fmt}"')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.send_header('Vary', 'Accept-Encoding')
+        if compressor:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+
+        events = EVENT_STORE.iter_query(**filters)
+        if param('archive') in ('1', 'true') and HAS_NUMPY:
+            events = itertools.chain(events, EVENT_ARCHIVE.iter_events(**filters))
+        try:
+            for data in export_chunks(events, fmt):
+                self.write_chunk(compressor.compress(data) if compressor else data, chunked)
+            if compressor:
+                self.write_chunk(compressor.flush(), chunked)
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            LOG.info("⚠️ Export aborted by client")
+            return
+        LOG.info("📤 Export finished (%s%s)", fmt, ", gzip" if compressor else "")
+
+    def api_archive_stats(self, query):
+        """GET /api/archive/stats?wallet=&mint=&since=&until= - sumos ir histogramos"""
+        if not HAS_NUMPY:
+            self.send_json({"error": "numpy is not installed"}, status=503)
+            return
+        def param(name):
+            value = query.get(name, [''])[0].strip()
+            return value or None
+        try:
+            since = int(param('since')) if param('since') else None
+            until = int(param('until')) if param('until') else None
+        except ValueError:
+            self.send_json({"error": "since and until must be integers"}, status=400)
+            return
+        self.send_json(EVENT_ARCHIVE.stats(wallet=param('wallet'), mint=param('mint'),
+                                           since=since, until=until))
+
+    def api_search(self, query):
+        """GET /api/search?q=<prefiksas>&limit=20"""
+        q = query.get('q', [''])[0].strip()
+        if len(q) < SEARCH_MIN_PREFIX:
+            self.send_json({"error": f"q must be at least {SEARCH_MIN_PREFIX} characters"}, status=400)
+            return
+        try:
+            limit = min(max(int(query.get('limit', ['20'])[0]), 1), API_MAX_LIMIT)
+        except ValueError:
+            self.send_json({"error": "limit must be an integer"}, status=400)
+            return
+        results = []
+        for value, kinds in ADDRESS_INDEX.search(q, limit):
+            item = {"value": value, "kinds": kinds}
+            if "wallet" in kinds:
+                item["wallet_events"] = EVENT_STORE.count(wallet=value)
+            if "mint" in kinds:
+                item["mint_events"] = EVENT_STORE.count(mint=value)
+                meta = MINT_METADATA.get(value)
+                item["symbol"] = meta.get("symbol") if meta else None
+            results.append(item)
+        self.send_json({"q": q, "results": results})
+
+    def api_stats(self):
+        """GET /api/stats - pipeline etapų trukmės ir aptikimo vėlavimas"""
+        self.send_json({"events": len(EVENT_STORE),
+                        "archived_events": EVENT_ARCHIVE.count() if HAS_NUMPY else 0,
+                        "stages": STAGE_STATS.summary(),
+                        "lag": LAG_STATS.summary(),
+                        "filters": INGEST_FILTER.stats(),
+                        "logging": log_stats(),
+                        "pipeline": INGEST_PIPELINE.stats() if INGEST_PIPELINE is not None else None})
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        path = url.path
+        if path == '/api/events':
+            self.api_events(urllib.parse.parse_qs(url.query))
+        elif path == '/api/positions':
+            self.api_positions(urllib.parse.parse_qs(url.query))
+        elif path == '/api/top-mints':
+            self.api_top_mints(urllib.parse.parse_qs(url.query))
+        elif path == '/':
+            etag = dashboard_etag()
+            if self.not_modified(etag):
+                return
+            body, gzipped = cached_dashboard(etag)
+            self.send_body(body, 'text/html; charset=utf-8', etag=etag,
+                           cache_control=PAGE_CACHE_CONTROL, gzipped=gzipped)
+        elif path in STATIC_ASSETS:
+            asset = STATIC_ASSETS[path]
+            if self.not_modified(asset.etag):
+                return
+            self.send_body(asset.body, asset.content_type, etag=asset.etag,
+                           cache_control=STATIC_CACHE_CONTROL, gzipped=asset.gzipped)
+        elif path == '/api/stats':
+            self.api_stats()
+        elif path == '/api/search':
+            self.api_search(urllib.parse.parse_qs(url.query))
+        elif path == '/api/archive/stats':
+            self.api_archive_stats(urllib.parse.parse_qs(url.query))
+        elif path == '/export':
+            self.export_events(urllib.parse.parse_qs(url.query))
+        else:
+            self.send_error(404)
+
+    def do_HEAD(self):
+        """HEAD = GET be kūno (send_body jo nerašo); eksportas srautinis, todėl neleidžiamas"""
+        if urllib.parse.urlsplit(self.path).path == '/export':
+            self.send_response(405)
+            self.send_header('Allow', 'GET')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.do_GET()
+
+    def read_body(self, max_bytes=None):
+        content_length = int(self.headers.get('Content-Length') or 0)
+        if max_bytes is not None and content_length > max_bytes:
+            return None
+        return self.rfile.read(content_length)
+
+    def api_wallets_bulk(self, query):
+        """POST /api/wallets/bulk - JSON arba wallet'ai po vieną eilutėje"""
+        raw = self.read_body(BULK_MAX_BYTES)
+        if raw is None:
+            self.send_json({"error": f"body larger than {BULK_MAX_BYTES} bytes"}, status=413)
+            return
+        text = raw.decode('utf-8', errors='replace')
+        content_type = self.headers.get('Content-Type', '')
+        mode = query.get('mode', ['add'])[0]
+        if mode not in ('add', 'remove'):
+            self.send_json({"error": "mode must be add or remove"}, status=400)
+            return
+
+        add, remove = [], []
+        if 'json' in content_type:
+            try:
+                payload = json.loads(text)
+            except ValueError as e:
+                self.send_json({"error": f"invalid JSON: {e}"}, status=400)
+                return
+            if isinstance(payload, list):
+                payload = {mode: payload}
+            elif not isinstance(payload, dict):
+                self.send_json({"error": "expected a list or an object with add/remove"}, status=400)
+                return
+            for key, target in (('add', add), ('remove', remove)):
+                items = payload.get(key) or []
+                if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+                    self.send_json({"error": f"{key} must be a list of strings"}, status=400)
+                    return
+                target.extend(items)
         else:
-            super().do_GET()
+            lines = [line for line in text.splitlines() if line.strip() and not line.lstrip().startswith('#')]
+            (add if mode == 'add' else remove).extend(lines)
+
+        try:
+            result = apply_wallet_changes(add=add, remove=remove)
+        except IOError as e:
+            self.send_json({"error": str(e)}, status=500)
+            return
+        result["invalid_count"] = len(result["invalid"])
+        result["invalid"] = result["invalid"][:50]
+        LOG.info("📦 Bulk wallets: +%d -%d (%d invalid), now %d", result['added'], result['removed'],
+                 result['invalid_count'], result['wallet_count'])
+        self.send_json(result)
 
     def do_POST(self):
         """Handle POST requests for wallet management"""
-        if self.path == '/add-wallet':
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length).decode('utf-8')
-            parsed_data = urllib.parse.parse_qs(post_data)
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/api/wallets/bulk':
+            self.api_wallets_bulk(urllib.parse.parse_qs(url.query))
+
+        elif url.path == '/add-wallet':
+            parsed_data = urllib.parse.parse_qs(self.read_body().decode('utf-8'))
             wallet = parsed_data.get('wallet', [''])[0].strip()
             
             if wallet and validate_wallet_address(wallet):
-                if wallet not in VALID_WALLETS:
-                    VALID_WALLETS.append(wallet)
-                    save_wallets(VALID_WALLETS)
-                    message = f"✅ Wallet {wallet[:8]}... added successfully!"
-                    print(f"➕ Added new wallet: {wallet}")
+                try:
+                    result = apply_wallet_changes(add=[wallet])
+                except IOError:
+                    message = "❌ Could not save wallet list!"
                 else:
-                    message = f"⚠️ Wallet already exists!"
+                    if result["added"]:
+                        message = f"✅ Wallet {wallet[:8]}... added successfully!"
+                        LOG.info("➕ Added new wallet: %s", wallet)
+                    else:
+                        message = f"⚠️ Wallet already exists!"
             else:
                 message = "❌ Invalid wallet address!"
             
@@ -909,85 +4006,95 @@ class CSVHandler(http.server.SimpleHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(f'<script>alert("{message}"); window.location="/";</script>'.encode())
             
-        elif self.path == '/remove-wallet':
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length).decode('utf-8')
-            parsed_data = urllib.parse.parse_qs(post_data)
+        elif url.path == '/remove-wallet':
+            parsed_data = urllib.parse.parse_qs(self.read_body().decode('utf-8'))
             wallet = parsed_data.get('wallet', [''])[0].strip()
             
-            if wallet in VALID_WALLETS:
-                VALID_WALLETS.remove(wallet)
-                save_wallets(VALID_WALLETS)
-                print(f"🗑️ Removed wallet: {wallet}")
+            alert = ''
+            try:
+                if apply_wallet_changes(remove=[wallet])["removed"]:
+                    LOG.info("🗑️ Removed wallet: %s", wallet)
+            except IOError:
+                alert = 'alert("❌ Could not save wallet list!"); '
             
             self.send_response(200)
             self.send_header('Content-type', 'text/html')
             self.end_headers()
-            self.wfile.write(b'<script>window.location="/";</script>')
+            self.wfile.write(f'<script>{alert}window.location="/";</script>'.encode())
         else:
-            super().do_POST()
+            self.send_error(404)
+
+class DashboardServer(socketserver.ThreadingTCPServer):
+    """Kiekviena užklausa savo gijoje - ilgas eksportas neblokuoja dashboard'o"""
+    daemon_threads = True
+    allow_reuse_address = True
+
 
 def start_simple_server():
     """Paleisti web serverį su Render.com PORT"""
     try:
-        with socketserver.TCPServer(("", PORT), CSVHandler) as httpd:
-            print(f"🌐 Web dashboard started: http://0.0.0.0:{PORT}")
-            print(f"👀 Watching {len(VALID_WALLETS)} wallets:")
-            for wallet in VALID_WALLETS:
-                print(f"   - {wallet}")
-            if RENDER:
-                print("🚀 Running on Render.com")
-            else:
-                print("💻 Running locally")
+        with DashboardServer(("", PORT), CSVHandler) as httpd:
+            LOG.info("🌐 Web dashboard started: http://0.0.0.0:%d", PORT)
+            LOG.info("👀 Watching %d wallets: %s", len(VALID_WALLETS), ", ".join(VALID_WALLETS))
+            LOG.info("🚀 Running on Render.com" if RENDER else "💻 Running locally")
             httpd.serve_forever()
     except OSError as e:
-        print(f"❌ Port {PORT} error: {e}")
-        with socketserver.TCPServer(("", 8001), CSVHandler) as httpd:
-            print(f"🌐 Web dashboard started on fallback: http://0.0.0.0:8001")
+        LOG.error("❌ Port %d error: %s", PORT, e)
+        with DashboardServer(("", 8001), CSVHandler) as httpd:
+            LOG.info("🌐 Web dashboard started on fallback: http://0.0.0.0:%d", 8001)
             httpd.serve_forever()
 
+def _stop_on_sigterm(signum, frame):
+    raise KeyboardInterrupt
+
+
 def main():
     """Pagrindinė programa"""
-    print("🚀 Starting Wallet CA Tracker with Web Dashboard...")
+    started = time.time()
+    setup_logging()
+    LOG.info("🚀 Starting Wallet CA Tracker with Web Dashboard...")
     
-    if RENDER:
-        print("🌍 Render.com environment detected")
+    global RPC_RECORDER
+    if RPC_RECORD_FILE:
+        RPC_RECORDER = RPCRecorder(RPC_RECORD_FILE)
+        # Uždaryti ir tada, kai procesas baigiasi ne per Ctrl+C (SIGTERM, break)
+        atexit.register(RPC_RECORDER.close)
+        LOG.info("⏺️ Recording RPC traffic to %s", RPC_RECORD_FILE)
     
-    # Perkrauti wallet'us
-    global VALID_WALLETS
-    VALID_WALLETS = get_valid_wallets()
+    # Render stabdo procesą SIGTERM'u - tvarkingas išjungimas kaip po Ctrl+C
+    signal.signal(signal.SIGTERM, _stop_on_sigterm)
     
-    if not VALID_WALLETS:
-        print("❌ No valid wallets! Adding default ones...")
-        VALID_WALLETS = ["4Vgu5AHT1ndczhdgqAipNDqLsCPjBS5jMXkEg8yzhT9c"]
-        save_wallets(VALID_WALLETS)
+    if RENDER:
+        LOG.info("🌍 Render.com environment detected")
     
-    print(f"✅ Final wallet count: {len(VALID_WALLETS)}")
+    # Wallet'ai, cursor'iai, paskutiniai įvykiai ir agregatai - iš vieno snapshot'o
+    seen, live_from_seq, aggregates_key = fast_start()
+    LOG.info("✅ Final wallet count: %d", len(VALID_WALLETS))
     
     # Start web server in background thread
     server_thread = threading.Thread(target=start_simple_server, daemon=True)
     server_thread.start()
     
-    print(f"✅ Web dashboard available on port {PORT}")
+    LOG.info("✅ Web dashboard available on port %d", PORT)
     
     # Tik dabar kiti dalykai
     try:
         validate_config()
-        print("✅ Configuration validated successfully")
+        LOG.info("✅ Configuration validated successfully")
     except Exception as e:
-        print(f"❌ Configuration error: {e}")
-        print("🔄 Continuing anyway...")
+        LOG.error("❌ Configuration error: %s - continuing anyway", e)
     
-    init_csv()
-    seen = load_seen()
+    # Likęs įkėlimas vyksta fone, poller'is nelaukia
+    threading.Thread(target=finish_startup, args=(seen, live_from_seq, aggregates_key), daemon=True).start()
     
-    for w in VALID_WALLETS:
-        seen.setdefault(w, set())
+    global INGEST_PIPELINE
+    INGEST_PIPELINE = IngestPipeline(seen).start()
+    LOG.info("✅ Ingest pipeline: %d fetch / %d extract workers, queue %d", FETCH_WORKERS, EXTRACT_WORKERS, INGEST_QUEUE_SIZE)
     
-    print(f"👀 Watching {len(VALID_WALLETS)} wallets")
-    print(f"⏰ Poll interval: {POLL_INTERVAL}s")
-    print("⏹️  Press Ctrl+C to stop\n")
-    print("🌐 Web dashboard should be running now!")
+    LOG.info("👀 Watching %d wallets", len(VALID_WALLETS))
+    LOG.info("⏰ Poll interval: %ss", POLL_INTERVAL)
+    LOG.info("⏹️  Press Ctrl+C to stop")
+    LOG.info("⚡ Polling starts %.0fms after launch", (time.time() - started) * 1000)
 
     error_count = 0
     max_errors = 10
@@ -995,35 +4102,58 @@ def main():
     try:
         while True:
             try:
-                current_wallets = get_valid_wallets()
+                # Sąrašas pakeičiamas atomiškai, todėl visas bulk pakeitimas matomas iš karto
+                current_wallets = VALID_WALLETS
+                INGEST_FILTER.maybe_reload()
                 for w in current_wallets:
-                    seen.setdefault(w, set())
+                    # Be cursor'iaus reikia pilno seen, kitaip būtų pakartotinių pranešimų
+                    if not seen.loaded.is_set() and w not in seen.cursors:
+                        continue
+                    try:
+                        # Praleidžiamas, jei ankstesnis batch'as dar konvejeryje
+                        INGEST_PIPELINE.poll(w)
+                    except Exception as e:
+                        LOG.error("Wallet process error: %s", e)
                 
-                for w in current_wallets:
-                    seen = process_wallet_transactions(w, seen)
-                
-                atomic_write_seen(seen)
+                seen.commit()
                 error_count = 0
-                print(f"💤 Sleeping for {POLL_INTERVAL}s...")
+                LOG.info("💤 Sleeping for %ss...", POLL_INTERVAL)
                 
             except Exception as e:
                 error_count += 1
-                print(f"⚠️ Main loop error #{error_count}: {e}")
+                LOG.warning("⚠️ Main loop error #%d: %s", error_count, e)
                 if error_count >= max_errors:
-                    print("❌ Too many errors, but keeping web server alive...")
+                    LOG.error("❌ Too many errors, but keeping web server alive...")
                     break
                 time.sleep(5)
             
             time.sleep(POLL_INTERVAL)
             
     except KeyboardInterrupt:
-        print("\n🛑 Stopped by user")
-        atomic_write_seen(seen)
-        print("✅ Clean shutdown completed")
+        LOG.info("🛑 Stopped by user")
+        INGEST_PIPELINE.drain()
+        seen.close()
+        if RPC_RECORDER is not None:
+            RPC_RECORDER.close()
+        save_state_snapshot(seen)
+        LOG.info("✅ Clean shutdown completed")
     except Exception as e:
-        print(f"💥 Fatal error: {e}")
-        atomic_write_seen(seen)
-        print("✅ Emergency shutdown completed")
+        LOG.error("💥 Fatal error: %s", e)
+        INGEST_PIPELINE.drain()
+        seen.close()
+        if RPC_RECORDER is not None:
+            RPC_RECORDER.close()
+        save_state_snapshot(seen)
+        LOG.info("✅ Emergency shutdown completed")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Wallet CA Tracker")
+    parser.add_argument("--replay", metavar="CAPTURE",
+                        help="replay a capture recorded with RPC_RECORD_FILE instead of polling")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed multiplier (default: real time)")
+    args = parser.parse_args()
+    if args.replay:
+        run_replay(args.replay, args.speed)
+    else:
+        main()
\ No newline at end of file